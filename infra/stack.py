@@ -1,6 +1,8 @@
+from typing import Dict, List, Optional
+
+import jsii
 from aws_cdk import (
     aws_secretsmanager as secretsmanager,
-    aws_iam as iam,
     aws_lambda as lambda_,
     aws_dynamodb as dynamodb,
     aws_events as events,
@@ -8,41 +10,149 @@ from aws_cdk import (
     aws_apigateway as apigateway,
     aws_sns as sns,
     aws_sns_subscriptions as sns_subscriptions,
+    aws_sqs as sqs,
+    aws_lambda_event_sources as lambda_event_sources,
+    aws_lambda_destinations as destinations,
     RemovalPolicy,
     Stack,
     Duration
 )
-from aws_cdk.aws_lambda_python_alpha import PythonFunction
+from aws_cdk.aws_lambda_python_alpha import (
+    BundlingOptions,
+    ICommandHooks,
+    PythonFunction,
+    PythonLayerVersion,
+)
 from constructs import Construct
 
+# Source root shared by every function bundle
+SERVERLESS_ENTRY = "../serverless"
+
+# Third-party dependencies shared by every function, shipped as one layer
+LAYER_ENTRY = "../serverless/layer"
+
+# Local artifacts that never belong in a bundle. Excluding them keeps running
+# the code or tests locally from changing asset hashes and forcing a re-bundle.
+BUNDLE_EXCLUDES = [
+    "**/__pycache__",
+    "**/*.py[co]",
+    "**/tests",
+    "**/.venv",
+    "**/*.md",
+]
+
+# One package per Lambda under SERVERLESS_ENTRY; everything else (common/) is shared
+FUNCTION_PACKAGES = [
+    "collector",
+    "analyzer",
+    "signal_analyzer",
+    "resolution_tracker",
+    "publisher",
+]
+
+
+def compile_bytecode(output_dir: str) -> str:
+    """
+    Command that compiles every module in a bundle ahead of time.
+
+    unchecked-hash pycs are used regardless of source mtimes, which the zip
+    round trip does not preserve. A module that fails to compile is simply
+    compiled at import time as before, so failures do not fail the bundle.
+    """
+    return f"python -m compileall -q -f --invalidation-mode unchecked-hash {output_dir} || true"
+
+
+@jsii.implements(ICommandHooks)
+class FunctionBundlingHooks:
+    """Ship precompiled bytecode with the handler code"""
+
+    def before_bundling(self, input_dir: str, output_dir: str) -> List[str]:
+        return []
+
+    def after_bundling(self, input_dir: str, output_dir: str) -> List[str]:
+        return [compile_bytecode(output_dir)]
+
+
+@jsii.implements(ICommandHooks)
+class LayerBundlingHooks:
+    """Strip files the runtime never loads, then precompile the dependencies"""
+
+    def before_bundling(self, input_dir: str, output_dir: str) -> List[str]:
+        return []
+
+    def after_bundling(self, input_dir: str, output_dir: str) -> List[str]:
+        return [
+            f"find {output_dir} -type d \\( -name __pycache__ -o -name tests \\) -prune -exec rm -rf {{}} +",
+            f"find {output_dir} -type f -name '*.py[co]' -delete",
+            compile_bytecode(output_dir),
+        ]
+
+
+def function_bundling(package: str) -> BundlingOptions:
+    """
+    Bundle a function with only its own package and the shared code.
+
+    Sibling packages are excluded from the asset, so editing one handler
+    no longer changes the asset hash (and re-bundle) of the other four.
+    """
+    return BundlingOptions(
+        asset_excludes=BUNDLE_EXCLUDES + ["layer"] + [other for other in FUNCTION_PACKAGES if other != package],
+        command_hooks=FunctionBundlingHooks(),
+    )
+
+
+class PolymarketLambda(Construct):
+    """
+    One of the watcher's Lambda functions, with the settings they all share.
+
+    Every function runs from its own package under SERVERLESS_ENTRY on
+    Python 3.12 / arm64 with the shared dependency layer, so only the
+    package, timeout and environment vary between them. Each function gets
+    its own execution role; grant it only the access its handler needs.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        id: str,
+        *,
+        package: str,
+        layer: PythonLayerVersion,
+        timeout: Duration,
+        environment: Dict[str, str],
+        snap_start: bool = True,
+        reserved_concurrent_executions: Optional[int] = None,
+    ) -> None:
+        super().__init__(scope, id)
+
+        self.function = PythonFunction(
+            self,
+            "Function",
+            entry=SERVERLESS_ENTRY,
+            index=f"{package}/{package}.py",
+            handler="lambda_handler",
+            bundling=function_bundling(package),
+            runtime=lambda_.Runtime.PYTHON_3_12,
+            layers=[layer],
+            snap_start=lambda_.SnapStartConf.ON_PUBLISHED_VERSIONS if snap_start else None,
+            timeout=timeout,
+            memory_size=512,
+            architecture=lambda_.Architecture.ARM_64,
+            environment=environment,
+            reserved_concurrent_executions=reserved_concurrent_executions,
+        )
+
 
 class PolyMarketStack(Stack):
     def __init__(self, scope: Construct, id: str, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
-        # x API credentials secrets
-        x_access_token_secret = secretsmanager.Secret.from_secret_name_v2(
-            self,
-            "XAccessTokenSecret",
-            secret_name="polymarket/x-access-token",
-        )
-        
-        x_access_token_secret_secret = secretsmanager.Secret.from_secret_name_v2(
-            self,
-            "XAccessTokenSecretSecret",
-            secret_name="polymarket/x-access-token-secret",
-        )
-        
-        x_consumer_key_secret = secretsmanager.Secret.from_secret_name_v2(
+        # x API credentials secret (JSON: access_token, access_token_secret,
+        # consumer_key, consumer_secret)
+        x_credentials_secret = secretsmanager.Secret.from_secret_name_v2(
             self,
-            "XConsumerKeySecret",
-            secret_name="polymarket/x-consumer-key",
-        )
-        
-        x_consumer_secret_secret = secretsmanager.Secret.from_secret_name_v2(
-            self,
-            "XConsumerSecretSecret",
-            secret_name="polymarket/x-consumer-secret",
+            "XCredentialsSecret",
+            secret_name="polymarket/x-credentials",
         )
 
         # DynamoDB Tables
@@ -51,29 +161,71 @@ class PolyMarketStack(Stack):
             "MarketsTable",
             table_name="PolymarketMarkets",
             partition_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
             removal_policy=RemovalPolicy.DESTROY,
             time_to_live_attribute="ttl"
         )
 
+        # Markets the collector has refreshed, by refresh time, carrying only
+        # the attributes the analyzers read. The active flag is sharded per
+        # market ('1#<shard>') so one collection burst spreads over partitions
+        markets_table.add_global_secondary_index(
+            index_name="ActiveIndex",
+            partition_key=dynamodb.Attribute(name="active", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="last_updated", type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=[
+                "question",
+                "slug",
+                "current_price",
+                "liquidity",
+                "volume24hr",
+                "outcome_index",
+                "tracked_outcome",
+                "categories",
+                "market_end_date"
+            ]
+        )
+
         historical_table = dynamodb.Table(
             self,
             "HistoricalTable",
             table_name="PolymarketHistorical",
             partition_key=dynamodb.Attribute(name="market_id", type=dynamodb.AttributeType.STRING),
             sort_key=dynamodb.Attribute(name="timestamp", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
             removal_policy=RemovalPolicy.DESTROY,
             time_to_live_attribute="ttl"
         )
 
+        # Recent price points across all markets, partitioned by UTC hour and
+        # market shard ('<hour>#<shard>'); readers query every shard of an hour
+        historical_table.add_global_secondary_index(
+            index_name="ByTimeBucket",
+            partition_key=dynamodb.Attribute(name="time_bucket", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="timestamp", type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=["outcome_index", "price"]
+        )
+
         posts_table = dynamodb.Table(
             self,
             "PostsTable",
             table_name="PolymarketPosts",
             partition_key=dynamodb.Attribute(name="market_id", type=dynamodb.AttributeType.STRING),
             sort_key=dynamodb.Attribute(name="posted_at", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
             removal_policy=RemovalPolicy.DESTROY,
             time_to_live_attribute="ttl"
         )
+
+        # All posts by time; every post shares the constant gsi_pk "POST"
+        posts_table.add_global_secondary_index(
+            index_name="PostsByTime",
+            partition_key=dynamodb.Attribute(name="gsi_pk", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="posted_at", type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.KEYS_ONLY
+        )
         
         # New tables for enhanced signal detection and resolution tracking
         signals_table = dynamodb.Table(
@@ -82,9 +234,18 @@ class PolyMarketStack(Stack):
             table_name="PolymarketSignals",
             partition_key=dynamodb.Attribute(name="market_id", type=dynamodb.AttributeType.STRING),
             sort_key=dynamodb.Attribute(name="signal_id", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
             removal_policy=RemovalPolicy.DESTROY,
             time_to_live_attribute="ttl"
         )
+
+        # Recent signals across all markets, partitioned by UTC hour
+        signals_table.add_global_secondary_index(
+            index_name="SignalsByTimeBucket",
+            partition_key=dynamodb.Attribute(name="time_bucket", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="detection_timestamp", type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.KEYS_ONLY
+        )
         
         resolutions_table = dynamodb.Table(
             self,
@@ -92,6 +253,9 @@ class PolyMarketStack(Stack):
             table_name="PolymarketResolutions",
             partition_key=dynamodb.Attribute(name="market_id", type=dynamodb.AttributeType.STRING),
             sort_key=dynamodb.Attribute(name="resolution_timestamp", type=dynamodb.AttributeType.STRING),
+            # Written once per resolved market and only checked hourly
+            table_class=dynamodb.TableClass.STANDARD_INFREQUENT_ACCESS,
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
             removal_policy=RemovalPolicy.DESTROY,
             time_to_live_attribute="ttl"
         )
@@ -101,63 +265,36 @@ class PolyMarketStack(Stack):
             "ThresholdsTable",
             table_name="PolymarketThresholds",
             partition_key=dynamodb.Attribute(name="threshold_id", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
             removal_policy=RemovalPolicy.DESTROY,
             time_to_live_attribute="ttl"
         )
 
-        # Lambda execution role with permissions
-        lambda_execution_role = iam.Role(
+        # Shared dependency layer (boto3, requests, tweepy, ...) used by every function
+        shared_layer = PythonLayerVersion(
             self,
-            "PolymarketWatcherLambdaRole",
-            assumed_by=iam.ServicePrincipal("lambda.amazonaws.com"),
-            managed_policies=[
-                iam.ManagedPolicy.from_aws_managed_policy_name("service-role/AWSLambdaBasicExecutionRole")
-            ]
-        )   
-        
-        # Add explicit permissions for Secrets Manager
-        lambda_execution_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=["secretsmanager:GetSecretValue"],
-                resources=[
-                    f"arn:aws:secretsmanager:{self.region}:{self.account}:secret:polymarket/x-access-token*",
-                    f"arn:aws:secretsmanager:{self.region}:{self.account}:secret:polymarket/x-access-token-secret*",
-                    f"arn:aws:secretsmanager:{self.region}:{self.account}:secret:polymarket/x-consumer-key*",
-                    f"arn:aws:secretsmanager:{self.region}:{self.account}:secret:polymarket/x-consumer-secret*"
-                ]
-            )
+            "SharedDepsLayer",
+            entry=LAYER_ENTRY,
+            compatible_runtimes=[lambda_.Runtime.PYTHON_3_12],
+            compatible_architectures=[lambda_.Architecture.ARM_64],
+            bundling=BundlingOptions(
+                asset_excludes=BUNDLE_EXCLUDES,
+                command_hooks=LayerBundlingHooks(),
+            ),
         )
-        
-        # Add DynamoDB permissions
-        markets_table.grant_read_write_data(lambda_execution_role)
-        historical_table.grant_read_write_data(lambda_execution_role)
-        posts_table.grant_read_write_data(lambda_execution_role)
-        signals_table.grant_read_write_data(lambda_execution_role)
-        resolutions_table.grant_read_write_data(lambda_execution_role)
-        thresholds_table.grant_read_write_data(lambda_execution_role)
-
-        # Add Secrets Manager permissions
-        x_access_token_secret.grant_read(lambda_execution_role)
-        x_access_token_secret_secret.grant_read(lambda_execution_role)
-        x_consumer_key_secret.grant_read(lambda_execution_role)
-        x_consumer_secret_secret.grant_read(lambda_execution_role)
 
         # Collector Lambda
-        collector_lambda = PythonFunction(
+        collector_lambda = PolymarketLambda(
             self,
-            "CollectorFunction",
-            entry="../serverless",
-            index="collector/collector.py",
-            handler="lambda_handler",
-            runtime=lambda_.Runtime.PYTHON_3_9,
+            "Collector",
+            package="collector",
+            layer=shared_layer,
             timeout=Duration.minutes(10),
-            role=lambda_execution_role,
-            memory_size=256,
             environment={
                 "MARKETS_TABLE": markets_table.table_name,
                 "HISTORICAL_TABLE": historical_table.table_name
             }
-        )
+        ).function
 
         # Create SNS Topic for market movement events
         market_movements_topic = sns.Topic(
@@ -168,16 +305,12 @@ class PolyMarketStack(Stack):
         )
 
         # Analyzer Lambda
-        analyzer_lambda = PythonFunction(
+        analyzer_lambda = PolymarketLambda(
             self,
-            "AnalyzerFunction",
-            entry="../serverless",
-            index="analyzer/analyzer.py",
-            handler="lambda_handler",
-            runtime=lambda_.Runtime.PYTHON_3_9,
+            "Analyzer",
+            package="analyzer",
+            layer=shared_layer,
             timeout=Duration.minutes(5),
-            memory_size=256,
-            role=lambda_execution_role,
             environment={
                 "MARKETS_TABLE": markets_table.table_name,
                 "HISTORICAL_TABLE": historical_table.table_name,
@@ -185,80 +318,164 @@ class PolyMarketStack(Stack):
                 "SIGNALS_TABLE": signals_table.table_name,
                 "MARKET_MOVEMENTS_TOPIC_ARN": market_movements_topic.topic_arn
             }
-        )
-        market_movements_topic.grant_publish(analyzer_lambda)
+        ).function
         
         # Signal Analyzer Lambda
-        signal_analyzer_lambda = PythonFunction(
+        signal_analyzer_lambda = PolymarketLambda(
             self,
-            "SignalAnalyzerFunction",
-            entry="../serverless",
-            index="signal_analyzer/signal_analyzer.py",
-            handler="lambda_handler",
-            runtime=lambda_.Runtime.PYTHON_3_9,
+            "SignalAnalyzer",
+            package="signal_analyzer",
+            layer=shared_layer,
             timeout=Duration.minutes(5),
-            memory_size=256,
-            role=lambda_execution_role,
             environment={
                 "MARKETS_TABLE": markets_table.table_name,
                 "HISTORICAL_TABLE": historical_table.table_name,
                 "SIGNALS_TABLE": signals_table.table_name,
                 "THRESHOLDS_TABLE": thresholds_table.table_name
             }
-        )
+        ).function
         
         # Resolution Tracker Lambda
-        resolution_tracker_lambda = PythonFunction(
+        resolution_tracker_lambda = PolymarketLambda(
             self,
-            "ResolutionTrackerFunction",
-            entry="../serverless",
-            index="resolution_tracker/resolution_tracker.py",
-            handler="lambda_handler",
-            runtime=lambda_.Runtime.PYTHON_3_9,
+            "ResolutionTracker",
+            package="resolution_tracker",
+            layer=shared_layer,
             timeout=Duration.minutes(5),
-            memory_size=256,
-            role=lambda_execution_role,
             environment={
                 "MARKETS_TABLE": markets_table.table_name,
                 "SIGNALS_TABLE": signals_table.table_name,
                 "RESOLUTIONS_TABLE": resolutions_table.table_name,
                 "THRESHOLDS_TABLE": thresholds_table.table_name
             }
-        )
+        ).function
 
         # Publisher Lambda
-        publisher_lambda = PythonFunction(
+        publisher_lambda = PolymarketLambda(
             self,
-            "PublisherFunction",
-            entry="../serverless",
-            index="publisher/publisher.py",
-            handler="lambda_handler",
-            runtime=lambda_.Runtime.PYTHON_3_9,
+            "Publisher",
+            package="publisher",
+            layer=shared_layer,
             timeout=Duration.minutes(2),
-            memory_size=256,
-            role=lambda_execution_role,
+            snap_start=False,
+            # Holds capacity for the queue consumer (and its provisioned
+            # environment) so unrelated bursts in the account can't throttle it
+            reserved_concurrent_executions=5,
             environment={
                 "MARKETS_TABLE": markets_table.table_name,
                 "HISTORICAL_TABLE": historical_table.table_name,
                 "POSTS_TABLE": posts_table.table_name,
-                "X_ACCESS_TOKEN_SECRET_NAME": "polymarket/x-access-token",
-                "X_ACCESS_TOKEN_SECRET_SECRET_NAME": "polymarket/x-access-token-secret",
-                "X_CONSUMER_KEY_SECRET_NAME": "polymarket/x-consumer-key",
-                "X_CONSUMER_SECRET_SECRET_NAME": "polymarket/x-consumer-secret"
+                "X_CREDENTIALS_SECRET_NAME": "polymarket/x-credentials"
             }
-        )
+        ).function
+        
+        # Per-function access. Each role only covers the tables its handler
+        # reads or writes (grants include the tables' indexes).
+        markets_table.grant_write_data(collector_lambda)
+        historical_table.grant_write_data(collector_lambda)
+
+        markets_table.grant_read_data(analyzer_lambda)
+        historical_table.grant_read_data(analyzer_lambda)
+        posts_table.grant_read_data(analyzer_lambda)
+        signals_table.grant_read_write_data(analyzer_lambda)
+        market_movements_topic.grant_publish(analyzer_lambda)
+
+        markets_table.grant_read_data(signal_analyzer_lambda)
+        historical_table.grant_read_data(signal_analyzer_lambda)
+        signals_table.grant_read_write_data(signal_analyzer_lambda)
+        thresholds_table.grant_read_write_data(signal_analyzer_lambda)
+
+        markets_table.grant_read_data(resolution_tracker_lambda)
+        signals_table.grant_read_write_data(resolution_tracker_lambda)
+        resolutions_table.grant_read_write_data(resolution_tracker_lambda)
+
+        posts_table.grant_write_data(publisher_lambda)
+        x_credentials_secret.grant_read(publisher_lambda)
         
-        # Subscribe publisher to SNS topic
+        # Keep a warm publisher environment so SNS deliveries skip the cold start
+        publisher_alias = lambda_.Alias(
+            self,
+            "PublisherAlias",
+            alias_name="live",
+            version=publisher_lambda.current_version,
+            provisioned_concurrent_executions=1
+        )
+
+        # Queue market movements for the publisher so one invocation (and one
+        # Twitter client) handles a batch of messages instead of one each
+        publisher_dead_letter_queue = sqs.Queue(
+            self,
+            "PublisherDeadLetterQueue",
+            retention_period=Duration.days(14)
+        )
+        publisher_queue = sqs.Queue(
+            self,
+            "PublisherQueue",
+            visibility_timeout=Duration.minutes(3),
+            dead_letter_queue=sqs.DeadLetterQueue(
+                max_receive_count=3,
+                queue=publisher_dead_letter_queue
+            )
+        )
         market_movements_topic.add_subscription(
-            sns_subscriptions.LambdaSubscription(publisher_lambda)
+            sns_subscriptions.SqsSubscription(publisher_queue, raw_message_delivery=True)
+        )
+        publisher_alias.add_event_source(
+            lambda_event_sources.SqsEventSource(
+                publisher_queue,
+                batch_size=10,
+                max_batching_window=Duration.seconds(5),
+                report_batch_item_failures=True,
+                # Stay within the reserved concurrency so pollers never hit
+                # throttles that would count against the receive limit
+                max_concurrency=5
+            )
+        )
+
+        # SnapStart restores from published versions, so schedules invoke aliases.
+        # A failed scheduled run is superseded by the next tick, so async retries
+        # would only buy extra cold invocations of the same work.
+        analyzer_alias = lambda_.Alias(
+            self,
+            "AnalyzerAlias",
+            alias_name="live",
+            version=analyzer_lambda.current_version,
+            retry_attempts=0
+        )
+        signal_analyzer_alias = lambda_.Alias(
+            self,
+            "SignalAnalyzerAlias",
+            alias_name="live",
+            version=signal_analyzer_lambda.current_version,
+            retry_attempts=0
+        )
+        resolution_tracker_alias = lambda_.Alias(
+            self,
+            "ResolutionTrackerAlias",
+            alias_name="live",
+            version=resolution_tracker_lambda.current_version,
+            retry_attempts=0
+        )
+        # The signal analyzer runs as soon as each collection finishes, so it
+        # always sees the prices that run just wrote. A plain destination is attached
+        # to the alias itself; response_only would route through an EventBridge rule
+        # that only matches $LATEST, which the schedule never invokes.
+        collector_alias = lambda_.Alias(
+            self,
+            "CollectorAlias",
+            alias_name="live",
+            version=collector_lambda.current_version,
+            retry_attempts=0,
+            on_success=destinations.LambdaDestination(signal_analyzer_alias)
         )
 
-        # Schedule for Collector Lambda (every 20 minutes)
+        # Schedule for Collector Lambda (every 20 minutes); the signal analyzer
+        # follows each run through the collector's on-success destination
         collector_schedule = events.Rule(
             self,
             "CollectorSchedule",
             schedule=events.Schedule.rate(Duration.minutes(20)),
-            targets=[targets.LambdaFunction(collector_lambda)]
+            targets=[targets.LambdaFunction(collector_alias)]
         )
 
         # Schedule for Analyzer Lambda (every 36 minutes)
@@ -266,15 +483,7 @@ class PolyMarketStack(Stack):
             self,
             "AnalyzerSchedule",
             schedule=events.Schedule.rate(Duration.minutes(36)),
-            targets=[targets.LambdaFunction(analyzer_lambda)]
-        )
-        
-        # Schedule for Signal Analyzer Lambda (every 15 minutes)
-        signal_analyzer_schedule = events.Rule(
-            self,
-            "SignalAnalyzerSchedule",
-            schedule=events.Schedule.rate(Duration.minutes(15)),
-            targets=[targets.LambdaFunction(signal_analyzer_lambda)]
+            targets=[targets.LambdaFunction(analyzer_alias)]
         )
         
         # Schedule for Resolution Tracker Lambda (every 60 minutes)
@@ -282,7 +491,7 @@ class PolyMarketStack(Stack):
             self,
             "ResolutionTrackerSchedule",
             schedule=events.Schedule.rate(Duration.minutes(60)),
-            targets=[targets.LambdaFunction(resolution_tracker_lambda)]
+            targets=[targets.LambdaFunction(resolution_tracker_alias)]
         )
 
         # API Gateway for manual triggering
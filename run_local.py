@@ -135,11 +135,21 @@ def run_publisher(market_updates=None):
     print("RUNNING PUBLISHER FUNCTION")
     print("=" * 80)
     
-    # If market_updates provided, use them in the event
+    # Deliver market_updates the way the deployed publisher receives them:
+    # as the analyzer's message inside an SNS record
     event = {}
     if market_updates:
         event = {
-            'market_updates': market_updates
+            'Records': [
+                {
+                    'Sns': {
+                        'Message': json.dumps({
+                            'timestamp': datetime.now().isoformat(),
+                            'markets': market_updates
+                        })
+                    }
+                }
+            ]
         }
     
     context = {}
@@ -181,7 +191,8 @@ def main():
     # Run collector
     collector_result = run_collector()
     
-    # Wait a moment to ensure data is available
+    # The analyzer finds markets through the eventually consistent ActiveIndex
+    # GSI, so give the collector's writes a moment to propagate
     print("Waiting for DynamoDB to update...")
     time.sleep(2)
     
@@ -193,7 +204,7 @@ def main():
     if analyzer_result and analyzer_result.get('statusCode') == 200:
         try:
             body = json.loads(analyzer_result.get('body', '{}'))
-            market_updates = body.get('market_updates')
+            market_updates = body.get('top_movers')
         except:
             pass
     
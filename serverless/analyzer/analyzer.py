@@ -6,219 +6,240 @@ It runs after the collector Lambda and triggers the publisher Lambda when signif
 It also integrates with the signal analyzer to provide enhanced market movement detection.
 """
 
+import heapq
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-import pytz
 import uuid
-
-import boto3
-from boto3.dynamodb.conditions import Key, Attr
-import concurrent.futures
-from decimal import Decimal
+from zoneinfo import ZoneInfo
 
 from common.config import (
-    MARKETS_TABLE,
     HISTORICAL_TABLE,
     POSTS_TABLE,
     SIGNALS_TABLE,
-    CONFIDENCE_WEIGHTS
+    TTL_DAYS,
+    HISTORICAL_TIME_BUCKET_INDEX,
+    SIGNALS_TIME_BUCKET_INDEX,
+    POSTS_TIME_INDEX,
+    POSTS_INDEX_PARTITION
 )
 
 from common.utils import (
     get_dynamodb_client,
+    get_dynamodb_low_level_client,
+    deserialize_item,
+    get_sns_client,
+    batch_write_to_dynamodb,
+    get_active_markets,
+    get_time_bucket,
+    get_time_buckets,
+    get_index_shard_keys,
+    calculate_ttl,
     calculate_price_change,
     get_volatility_threshold,
-    calculate_signal_accuracy_metrics
+    calculate_signal_accuracy_metrics,
+    to_decimal
 )
 
 # Get SNS topic ARN from environment
 MARKET_MOVEMENTS_TOPIC_ARN = os.environ.get('MARKET_MOVEMENTS_TOPIC_ARN')
 
+# Market fields included in the SNS message (the ones the publisher uses)
+PUBLISHED_MARKET_FIELDS = (
+    'id',
+    'question',
+    'slug',
+    'current_price',
+    'previous_price',
+    'price_change',
+    'tracked_outcome',
+    'confidence_score',
+    'has_signals'
+)
+
+# Timezone for the active-hours window, loaded once per execution environment
+EASTERN_TIMEZONE = ZoneInfo('America/New_York')
+
+# Build the AWS clients during init so warm invocations (and SnapStart
+# restores) reuse them instead of constructing new ones per call
+get_sns_client()
+get_dynamodb_low_level_client()
+get_dynamodb_client()
+
 def is_within_active_hours():
     """Check if current time is within active hours (9 AM to 7 PM EST)"""
     # Get current time in EST
-    est_tz = pytz.timezone('US/Eastern')
-    current_time = datetime.now(est_tz)
+    current_time = datetime.now(EASTERN_TIMEZONE)
     
     # Check if time is between 9 AM and 7 PM
     return 9 <= current_time.hour < 19
 
-def get_current_markets():
-    """Get all markets from DynamoDB"""
-    try:
-        # Initialize DynamoDB
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(MARKETS_TABLE)
-        
-        # Scan the table to get all markets
-        items = []
-        response = table.scan()
-        items.extend(response.get('Items', []))
-        
-        while 'LastEvaluatedKey' in response:
-            response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            items.extend(response.get('Items', []))
-        
-        return items
-    except Exception as e:
-        print(f"Error getting markets from DynamoDB: {e}")
-        return []
-
-def get_all_historical_prices_batch(market_ids, hours=6):
+def get_oldest_prices_batch(market_outcomes, hours=6):
     """
-    Get historical prices for multiple markets in batch
-    Returns a dictionary mapping market_id to its historical prices
+    Get the oldest price in the time window for multiple markets in batch
+    Returns a dictionary mapping market_id to its oldest price point
     
     Args:
-        market_ids: List of market IDs to get historical prices for
+        market_outcomes: Dictionary mapping market ID to its tracked outcome index
         hours: Number of hours to look back (default: 6)
     """
     try:
-        # Initialize DynamoDB
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(HISTORICAL_TABLE)
+        # Plain client: prices come back as floats rather than Decimals
+        client = get_dynamodb_low_level_client()
         
         # Calculate timestamp for 6 hours ago
-        timestamp_six_hours_ago = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
-        
-        # Store results for each market
-        results = {}
-        
-        # Process in batches to avoid excessive memory usage
-        batch_size = 25
-        for i in range(0, len(market_ids), batch_size):
-            batch_ids = market_ids[i:i+batch_size]
-            
-            # Use ThreadPoolExecutor for parallel queries
-            with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-                future_to_market = {
-                    executor.submit(
-                        table.query,
-                        KeyConditionExpression=Key('market_id').eq(mid) & Key('timestamp').gt(timestamp_six_hours_ago)
-                    ): mid for mid in batch_ids
+        six_hours_ago = datetime.now(timezone.utc) - timedelta(hours=hours)
+        timestamp_six_hours_ago = six_hours_ago.isoformat()
+        
+        # Store the oldest point for each market
+        oldest_points = {}
+        
+        # Buckets are read oldest first and each is sorted by timestamp, so the
+        # first matching row seen for a market is its oldest in the window. All of
+        # a market's rows in an hour share one shard, so reading that hour's
+        # shards one after another keeps this true
+        bucket_keys = [
+            shard_key
+            for bucket in get_time_buckets(six_hours_ago)
+            for shard_key in get_index_shard_keys(bucket)
+        ]
+        for bucket in bucket_keys:
+            query_kwargs = {
+                'TableName': HISTORICAL_TABLE,
+                'IndexName': HISTORICAL_TIME_BUCKET_INDEX,
+                'KeyConditionExpression': 'time_bucket = :bucket AND #ts > :since',
+                'ProjectionExpression': 'market_id, outcome_index, price, #ts',
+                'ExpressionAttributeNames': {'#ts': 'timestamp'},
+                'ExpressionAttributeValues': {
+                    ':bucket': {'S': bucket},
+                    ':since': {'S': timestamp_six_hours_ago}
                 }
+            }
+            response = client.query(**query_kwargs)
+            
+            while True:
+                for raw_item in response.get('Items', []):
+                    item = deserialize_item(raw_item)
+                    market_id = item.get('market_id')
+                    if (
+                        market_id in market_outcomes
+                        and market_id not in oldest_points
+                        and item.get('outcome_index') == market_outcomes[market_id]
+                    ):
+                        oldest_points[market_id] = item
                 
-                for future in concurrent.futures.as_completed(future_to_market):
-                    market_id = future_to_market[future]
-                    try:
-                        response = future.result()
-                        results[market_id] = response.get('Items', [])
-                    except Exception as e:
-                        print(f"Error querying historical prices for market {market_id}: {e}")
-                        results[market_id] = []
+                # Stop reading once every market has its oldest point
+                if len(oldest_points) == len(market_outcomes):
+                    return oldest_points
+                
+                if 'LastEvaluatedKey' not in response:
+                    break
+                
+                response = client.query(
+                    ExclusiveStartKey=response['LastEvaluatedKey'],
+                    **query_kwargs
+                )
         
-        return results
+        return oldest_points
     except Exception as e:
         print(f"Error in batch historical price retrieval: {e}")
         return {}
 
 def get_recently_posted_markets(hours=6):
-    """Get list of market IDs that have been posted about recently"""
+    """Get the set of market IDs that have been posted about recently"""
     try:
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(POSTS_TABLE)
+        # The paginator fetches pages lazily, so IDs are collected as they arrive
+        paginator = get_dynamodb_low_level_client().get_paginator('query')
         
         # Calculate timestamp for hours ago
         timestamp_hours_ago = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
         
-        # Scan for recent posts
-        response = table.scan(
-            FilterExpression=Attr('posted_at').gt(timestamp_hours_ago)
+        # Query the time index for recent posts
+        pages = paginator.paginate(
+            TableName=POSTS_TABLE,
+            IndexName=POSTS_TIME_INDEX,
+            KeyConditionExpression='gsi_pk = :pk AND posted_at > :since',
+            ProjectionExpression='market_id',
+            ExpressionAttributeValues={
+                ':pk': {'S': POSTS_INDEX_PARTITION},
+                ':since': {'S': timestamp_hours_ago}
+            }
         )
         
-        # Extract market IDs
-        market_ids = [item.get('market_id') for item in response.get('Items', [])]
-        
-        # Handle pagination if needed
-        while 'LastEvaluatedKey' in response:
-            response = table.scan(
-                FilterExpression=Attr('posted_at').gt(timestamp_hours_ago),
-                ExclusiveStartKey=response['LastEvaluatedKey']
-            )
-            market_ids.extend([item.get('market_id') for item in response.get('Items', [])])
-        
-        return market_ids
+        return {item['market_id']['S'] for page in pages for item in page['Items']}
     except Exception as e:
         print(f"Error getting recently posted markets: {e}")
-        return []
+        return set()
 
 def get_recent_signals(hours=6):
-    """Get list of market IDs that have had signals detected recently"""
+    """Get the set of market IDs that have had signals detected recently"""
     try:
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(SIGNALS_TABLE)
+        # The paginator fetches pages lazily, so IDs are collected as they arrive
+        paginator = get_dynamodb_low_level_client().get_paginator('query')
         
         # Calculate timestamp for hours ago
-        timestamp_hours_ago = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
-        
-        # Scan for recent signals
-        response = table.scan(
-            FilterExpression=Attr('detection_timestamp').gt(timestamp_hours_ago)
-        )
-        
-        # Extract market IDs
-        market_ids = [item.get('market_id') for item in response.get('Items', [])]
-        
-        # Handle pagination if needed
-        while 'LastEvaluatedKey' in response:
-            response = table.scan(
-                FilterExpression=Attr('detection_timestamp').gt(timestamp_hours_ago),
-                ExclusiveStartKey=response['LastEvaluatedKey']
+        hours_ago = datetime.now(timezone.utc) - timedelta(hours=hours)
+        timestamp_hours_ago = hours_ago.isoformat()
+        
+        market_ids = set()
+        
+        # Query each hour bucket in the window instead of scanning the table
+        for bucket in get_time_buckets(hours_ago):
+            pages = paginator.paginate(
+                TableName=SIGNALS_TABLE,
+                IndexName=SIGNALS_TIME_BUCKET_INDEX,
+                KeyConditionExpression='time_bucket = :bucket AND detection_timestamp > :since',
+                ProjectionExpression='market_id',
+                ExpressionAttributeValues={
+                    ':bucket': {'S': bucket},
+                    ':since': {'S': timestamp_hours_ago}
+                }
             )
-            market_ids.extend([item.get('market_id') for item in response.get('Items', [])])
+            market_ids.update(item['market_id']['S'] for page in pages for item in page['Items'])
         
-        return list(set(market_ids))  # Remove duplicates
+        return market_ids
     except Exception as e:
         print(f"Error getting recent signals: {e}")
-        return []
+        return set()
 
-def detect_significant_changes(markets):
-    """Detect markets with significant price changes"""
-    significant_changes = []
+def detect_significant_changes(markets, recently_posted, recent_signals):
+    """
+    Detect markets with significant price changes
     
-    # Get recently posted markets to avoid duplicates
-    recently_posted = get_recently_posted_markets()
+    Args:
+        markets: Markets to check
+        recently_posted: Set of IDs of markets posted about recently (skipped to avoid duplicates)
+        recent_signals: Set of IDs of markets with recent signals (given higher confidence)
+    """
+    significant_changes = []
     
-    # Get markets with recent signals
-    recent_signals = get_recent_signals()
+    # Skip markets that were recently posted about before any history is read
+    markets = [market for market in markets if market.get('id') not in recently_posted]
     
-    # Extract market IDs for batch processing
-    market_ids = [market.get('id') for market in markets if market.get('id')]
+    # Map market IDs to their tracked outcome for batch processing
+    market_outcomes = {
+        market.get('id'): market.get('outcome_index')
+        for market in markets if market.get('id')
+    }
     
-    # Get historical prices for all markets in batch
-    historical_prices_by_market = get_all_historical_prices_batch(market_ids)
+    # Get the oldest price in the window for all markets in batch
+    oldest_points = get_oldest_prices_batch(market_outcomes)
     
     for market in markets:
         market_id = market.get('id')
         
-        # Skip if this market was recently posted about
-        if market_id in recently_posted:
-            continue
-            
         current_price = float(market.get('current_price', 0))
         liquidity = float(market.get('liquidity', 0))
-        outcome_index = market.get('outcome_index')
         tracked_outcome = market.get('tracked_outcome')
         
-        # Get historical prices for this market
-        historical_prices = historical_prices_by_market.get(market_id, [])
-        
-        # Filter historical prices for the same outcome
-        historical_prices = [
-            p for p in historical_prices 
-            if p.get('outcome_index') == outcome_index
-        ]
-        
-        # Sort by timestamp (oldest first)
-        historical_prices.sort(key=lambda x: x.get('timestamp', ''))
-        
         # Need at least one historical price point
-        if not historical_prices:
+        oldest_point = oldest_points.get(market_id)
+        if oldest_point is None:
             continue
         
         # Get the oldest price in the time window
-        oldest_price = float(historical_prices[0].get('price', 0))
+        oldest_price = float(oldest_point.get('price', 0))
         
         # Calculate price change
         price_change = calculate_price_change(current_price, oldest_price)
@@ -230,7 +251,8 @@ def detect_significant_changes(markets):
         confidence_score = 0.5  # Default medium confidence
         
         # If this market has recent signals, increase confidence
-        if market_id in recent_signals:
+        has_signals = market_id in recent_signals
+        if has_signals:
             confidence_score = 0.7  # Higher confidence for markets with signals
         
         # If price change exceeds threshold, add to significant changes
@@ -247,85 +269,86 @@ def detect_significant_changes(markets):
                 'threshold_used': threshold,
                 'tracked_outcome': tracked_outcome,
                 'confidence_score': confidence_score,
-                'has_signals': market_id in recent_signals
+                'has_signals': has_signals
             })
     
-    # Sort by confidence score (descending) and then price change (descending)
-    significant_changes.sort(key=lambda x: (x['confidence_score'], x['price_change']), reverse=True)
-    
     return significant_changes
 
-def save_significant_change_as_signal(market_change):
-    """Save a significant price change as a signal"""
-    try:
-        # Generate a unique signal ID
-        signal_id = f"signal_{uuid.uuid4()}"
-        
-        # Create signal data
-        signal_data = {
-            'market_id': market_change['id'],
-            'signal_id': signal_id,
-            'question': market_change['question'],
-            'signal_type': 'PRICE_JUMP' if market_change['current_price'] > market_change['previous_price'] else 'PRICE_DROP',
-            'signal_strength': 'STRONG' if market_change['price_change'] > 0.15 else 'MODERATE',
-            'time_window': 6,  # Default 6-hour window
-            'current_price': Decimal(str(market_change['current_price'])),
-            'previous_price': Decimal(str(market_change['previous_price'])),
-            'price_change': Decimal(str(market_change['price_change'])),
-            'threshold_used': Decimal(str(market_change['threshold_used'])),
-            'confidence_score': Decimal(str(market_change['confidence_score'])),
-            'liquidity': Decimal(str(market_change['liquidity'])),
-            'categories': market_change['categories'],
-            'tracked_outcome': market_change['tracked_outcome'],
-            'detection_timestamp': datetime.now(timezone.utc).isoformat(),
-            'ttl': int((datetime.now(timezone.utc) + timedelta(days=365)).timestamp())
-        }
-        
-        # Predict outcome based on price movement
-        if market_change['tracked_outcome'] == 'Yes':
-            if market_change['current_price'] > market_change['previous_price']:
-                signal_data['predicted_outcome'] = 'Yes'
-            else:
-                signal_data['predicted_outcome'] = 'No'
-        
-        # Write to DynamoDB
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(SIGNALS_TABLE)
-        
-        response = table.put_item(Item=signal_data)
-        
-        return True
-    except Exception as e:
-        print(f"Error saving significant change as signal: {e}")
-        return False
+def build_signal_from_change(market_change):
+    """Build the signal item for a significant price change"""
+    # Generate a unique signal ID
+    signal_id = f"signal_{uuid.uuid4()}"
+    
+    # Create signal data
+    detection_timestamp = datetime.now(timezone.utc).isoformat()
+    signal_data = {
+        'market_id': market_change['id'],
+        'signal_id': signal_id,
+        'question': market_change['question'],
+        'signal_type': 'PRICE_JUMP' if market_change['current_price'] > market_change['previous_price'] else 'PRICE_DROP',
+        'signal_strength': 'STRONG' if market_change['price_change'] > 0.15 else 'MODERATE',
+        'time_window': 6,  # Default 6-hour window
+        'current_price': to_decimal(market_change['current_price']),
+        'previous_price': to_decimal(market_change['previous_price']),
+        'price_change': to_decimal(market_change['price_change']),
+        'threshold_used': to_decimal(market_change['threshold_used']),
+        'confidence_score': to_decimal(market_change['confidence_score']),
+        'liquidity': to_decimal(market_change['liquidity']),
+        'categories': market_change['categories'],
+        'tracked_outcome': market_change['tracked_outcome'],
+        'detection_timestamp': detection_timestamp,
+        'time_bucket': get_time_bucket(detection_timestamp),
+        'ttl': calculate_ttl(TTL_DAYS['signals'])
+    }
+    
+    # Predict outcome based on price movement
+    if market_change['tracked_outcome'] == 'Yes':
+        if market_change['current_price'] > market_change['previous_price']:
+            signal_data['predicted_outcome'] = 'Yes'
+        else:
+            signal_data['predicted_outcome'] = 'No'
+    
+    return signal_data
 
-def publish_top_movers_to_sns(significant_changes, max_markets=10):
+def select_top_movers(significant_changes, max_markets=10):
+    """
+    Get the top N significant changes by confidence score and then price
+    change, without sorting the whole list
+    """
+    return heapq.nlargest(
+        max_markets,
+        significant_changes,
+        key=lambda x: (x['confidence_score'], x['price_change'])
+    )
+
+def publish_top_movers_to_sns(top_movers):
     """Publish top market movers to SNS topic"""
-    if not significant_changes:
+    if not top_movers:
         print("No significant changes to publish")
         return False
     
-    # Take top N markets
-    top_movers = significant_changes[:max_markets]
-    
-    # Save each significant change as a signal
-    for market_change in top_movers:
-        save_significant_change_as_signal(market_change)
+    # Save the significant changes as signals in one batch write
+    signals = [build_signal_from_change(market_change) for market_change in top_movers]
+    if not batch_write_to_dynamodb(signals, SIGNALS_TABLE):
+        print("Failed to save significant changes as signals")
     
     try:
         # Initialize SNS client
-        sns = boto3.client('sns')
+        sns = get_sns_client()
         
-        # Create message
+        # Create message with only the fields the publisher reads
         message = {
             'timestamp': datetime.now(timezone.utc).isoformat(),
-            'markets': top_movers
+            'markets': [
+                {field: market[field] for field in PUBLISHED_MARKET_FIELDS}
+                for market in top_movers
+            ]
         }
         
         # Publish to SNS topic
         response = sns.publish(
             TopicArn=MARKET_MOVEMENTS_TOPIC_ARN,
-            Message=json.dumps(message),
+            Message=json.dumps(message, separators=(',', ':')),
             Subject='Polymarket Top Movers'
         )
         
@@ -347,27 +370,40 @@ def lambda_handler(event, context):
             })
         }
     
-    # Get all markets from DynamoDB
-    markets = get_current_markets()
-    print(f"Retrieved {len(markets)} markets from DynamoDB")
-    
-    # Detect significant changes
-    significant_changes = detect_significant_changes(markets)
-    print(f"Detected {len(significant_changes)} markets with significant changes")
-    
-    # Get signal accuracy metrics
-    accuracy_metrics = calculate_signal_accuracy_metrics()
-    print(f"Signal accuracy: {accuracy_metrics['accuracy']:.2f} ({accuracy_metrics['correct_signals']}/{accuracy_metrics['total_signals']})")
+    # The reads below are independent, so run them concurrently
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        markets_future = executor.submit(get_active_markets)
+        recently_posted_future = executor.submit(get_recently_posted_markets)
+        recent_signals_future = executor.submit(get_recent_signals)
+        accuracy_metrics_future = executor.submit(calculate_signal_accuracy_metrics)
+        
+        # Get the latest collected markets from DynamoDB
+        markets = markets_future.result()
+        print(f"Retrieved {len(markets)} markets from DynamoDB")
+        
+        # Detect significant changes, skipping recently posted markets
+        significant_changes = detect_significant_changes(
+            markets,
+            recently_posted_future.result(),
+            recent_signals_future.result()
+        )
+        print(f"Detected {len(significant_changes)} markets with significant changes")
+        
+        # Get signal accuracy metrics
+        accuracy_metrics = accuracy_metrics_future.result()
+        print(f"Signal accuracy: {accuracy_metrics['accuracy']:.2f} ({accuracy_metrics['correct_signals']}/{accuracy_metrics['total_signals']})")
     
     # Publish top movers to SNS
-    if significant_changes:
-        publish_top_movers_to_sns(significant_changes)
+    top_movers = select_top_movers(significant_changes)
+    if top_movers:
+        publish_top_movers_to_sns(top_movers)
     
     return {
         'statusCode': 200,
         'body': json.dumps({
             'message': f"Analyzed {len(markets)} markets, found {len(significant_changes)} with significant changes",
-            'signal_accuracy': accuracy_metrics
+            'signal_accuracy': accuracy_metrics,
+            'top_movers': top_movers
         })
     }
 
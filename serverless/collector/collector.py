@@ -6,67 +6,45 @@ It runs on a schedule (every 5 minutes) to keep the market data up to date.
 """
 
 import json
-import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 
-import boto3
-import requests
-from decimal import Decimal
-
 from common.config import (
-    POLYMARKET_API_URL,
     MARKETS_TABLE,
     HISTORICAL_TABLE,
+    ACTIVE_MARKET_FLAG,
     TTL_DAYS
 )
 from common.utils import (
+    fetch_market_pages,
     categorize_market,
     batch_write_to_dynamodb,
     get_tracked_outcome_and_price,
-    calculate_ttl
+    get_time_bucket,
+    get_index_shard_key,
+    calculate_ttl,
+    get_dynamodb_client,
+    get_http_session,
+    to_decimal
 )
 
+# Build the DynamoDB client and HTTP session during init so warm invocations
+# (and SnapStart restores) reuse them instead of constructing new ones per call
+get_dynamodb_client()
+get_http_session()
+
 def fetch_markets(limit=100, active=True):
     """Fetch markets from Polymarket API"""
-    all_markets = []
-    offset = 0
+    params = {
+        'active': active,
+        'ascending': False,
+        'end_date_min': (datetime.now(timezone.utc) - timedelta(days=3)).strftime('%Y-%m-%d'),
+        'liquidity_num_min': 5_000,
+        'volume_num_min': 20_000
+    }
     
-    while True:
-        params = {
-            'limit': limit,
-            'offset': offset,
-            'active': active,
-            'ascending': False,
-            'end_date_min': (datetime.now(timezone.utc) - timedelta(days=3)).strftime('%Y-%m-%d'),
-            'liquidity_num_min': 5_000,
-            'volume_num_min': 20_000
-        }
-        
-        try:
-            print(f"Fetching markets with offset {offset}...")
-            response = requests.get(POLYMARKET_API_URL, params=params)
-            response.raise_for_status()
-            
-            markets_data = response.json()
-            
-            # Check if we got any markets back
-            if not markets_data:
-                break
-                
-            # Add markets to our collection
-            all_markets.extend(markets_data)
-            
-            # If we got fewer markets than the limit, we've reached the end
-            if len(markets_data) < limit:
-                break
-                
-            # Increment offset for next batch
-            offset += len(markets_data)
-            
-        except Exception as e:
-            print(f"Error fetching markets: {e}")
-            break
+    all_markets = fetch_market_pages(params, limit=limit)
     
     print(f"Fetched a total of {len(all_markets)} markets")
     return all_markets
@@ -74,18 +52,33 @@ def fetch_markets(limit=100, active=True):
 def process_markets(markets_data):
     """Process market data and store in DynamoDB"""
     if not markets_data:
-        return []
+        return 0
     
     processed_count = 0
-    relevant_markets = []
     market_items = []
     historical_items = []
     
+    # One timestamp for the whole collection run, shared by every item
+    now = datetime.now(timezone.utc)
+    timestamp = now.isoformat()
+    timestamp_epoch = int(now.timestamp())
+    time_bucket = get_time_bucket(timestamp)
+    market_ttl = calculate_ttl(TTL_DAYS['markets'])
+    historical_ttl = calculate_ttl(TTL_DAYS['historical'])
+    
+    # Items share a timestamp, so a market repeated across API pages would
+    # repeat a key within a batch write
+    seen_market_ids = set()
+    
     for market in markets_data:
         
         market_id = market.get('id')
         description = market.get('description')
         
+        if market_id in seen_market_ids:
+            continue
+        seen_market_ids.add(market_id)
+        
         # Get the tracked outcome and price
         tracked_outcome, current_price, outcome_index = get_tracked_outcome_and_price(market)
         
@@ -98,20 +91,21 @@ def process_markets(markets_data):
             'question': market.get('question'),
             'description': description,
             'slug': market.get('slug'),
-            'liquidity': Decimal(str(market.get('liquidity', 0))),
-            'volume': Decimal(str(market.get('volume', 0))),
+            'liquidity': to_decimal(market.get('liquidity', 0)),
+            'volume': to_decimal(market.get('volume', 0)),
             'market_start_date': market.get('startDate'),
             'market_end_date': market.get('endDate'),
             'image': market.get('image'),
             'closed': market.get('closed'),
             'submitted_by': market.get('submitted_by'),
-            'volume24hr': Decimal(str(market.get('volume24hr', 0))),
-            'current_price': Decimal(str(current_price)),
+            'volume24hr': to_decimal(market.get('volume24hr', 0)),
+            'current_price': to_decimal(current_price),
             'tracked_outcome': tracked_outcome,
             'outcome_index': outcome_index,
             'categories': categorize_market(market),
-            'last_updated': datetime.now(timezone.utc).isoformat(),
-            'ttl': calculate_ttl(TTL_DAYS['markets'])
+            'active': get_index_shard_key(ACTIVE_MARKET_FLAG, market_id),
+            'last_updated': timestamp,
+            'ttl': market_ttl
         }
         
         # Add to batch of market items
@@ -120,44 +114,38 @@ def process_markets(markets_data):
         # Prepare historical data for DynamoDB
         historical_item = {
             'market_id': market_id,
-            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'timestamp': timestamp,
+            'timestamp_epoch': timestamp_epoch,
+            'time_bucket': get_index_shard_key(time_bucket, market_id),
             'outcome': tracked_outcome,
             'outcome_index': outcome_index,
-            'price': Decimal(str(current_price)),
-            'ttl': calculate_ttl(TTL_DAYS['historical'])
+            'price': to_decimal(current_price),
+            'ttl': historical_ttl
         }
         
         # Add to batch of historical items
         historical_items.append(historical_item)
-            
-        relevant_markets.append({
-            'id': market_id,
-            'question': market.get('question'),
-            'description': description,
-            'slug': market.get('slug'),
-            'categories': categorize_market(market),
-        })
-            
+        
         processed_count += 1
     
-    # Batch write market items
-    if market_items:
-        print(f"Batch writing {len(market_items)} market items to DynamoDB...")
-        if batch_write_to_dynamodb(market_items, MARKETS_TABLE):
-            print(f"Successfully wrote {len(market_items)} market items to DynamoDB")
-        else:
-            print("Failed to write market items to DynamoDB")
-    
-    # Batch write historical items
-    if historical_items:
-        print(f"Batch writing {len(historical_items)} historical items to DynamoDB...")
-        if batch_write_to_dynamodb(historical_items, HISTORICAL_TABLE):
-            print(f"Successfully wrote {len(historical_items)} historical items to DynamoDB")
-        else:
-            print("Failed to write historical items to DynamoDB")
+    # The two tables are independent, so flush both batches concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = {
+            'market': executor.submit(batch_write_to_dynamodb, market_items, MARKETS_TABLE),
+            'historical': executor.submit(batch_write_to_dynamodb, historical_items, HISTORICAL_TABLE)
+        }
+        
+        for item_type, items in (('market', market_items), ('historical', historical_items)):
+            if not items:
+                continue
+            
+            if futures[item_type].result():
+                print(f"Successfully wrote {len(items)} {item_type} items to DynamoDB")
+            else:
+                print(f"Failed to write {item_type} items to DynamoDB")
     
     print(f"Processed {processed_count} markets")
-    return relevant_markets
+    return processed_count
 
 def lambda_handler(event, context):
     """AWS Lambda handler function"""
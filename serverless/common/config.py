@@ -18,6 +18,14 @@ RESOLUTIONS_TABLE = os.environ.get('RESOLUTIONS_TABLE', 'polymarket-resolutions'
 SIGNALS_TABLE = os.environ.get('SIGNALS_TABLE', 'polymarket-signals')
 THRESHOLDS_TABLE = os.environ.get('THRESHOLDS_TABLE', 'polymarket-thresholds')
 
+# DynamoDB Indexes
+MARKETS_ACTIVE_INDEX = 'ActiveIndex'  # active ('1#<shard>') + last_updated
+HISTORICAL_TIME_BUCKET_INDEX = 'ByTimeBucket'  # time_bucket ('<UTC hour>#<shard>') + timestamp
+SIGNALS_TIME_BUCKET_INDEX = 'SignalsByTimeBucket'  # time_bucket (UTC hour) + detection_timestamp
+POSTS_TIME_INDEX = 'PostsByTime'  # gsi_pk + posted_at
+POSTS_INDEX_PARTITION = 'POST'  # gsi_pk value shared by every post
+INDEX_SHARD_COUNT = 4  # Shards per ActiveIndex / ByTimeBucket partition value, each market in one shard
+
 # Twitter API Credentials
 # Now handled via environment variables in the publisher Lambda
 
@@ -26,6 +34,8 @@ MAX_POSTS_PER_DAY = 100  # Maximum number of posts per 24 hours
 MIN_POST_INTERVAL = 15 * 60  # Minimum seconds between posts (15 minutes)
 
 # Market Tracking
+ACTIVE_MARKET_FLAG = '1'  # 'active' value (before its shard suffix) the collector writes on every market it refreshes
+ACTIVE_MARKET_MAX_AGE_MINUTES = 60  # Markets not refreshed within this window are no longer analyzed
 MIN_LIQUIDITY = 1000  # Minimum liquidity for a market to be tracked
 LOW_LIQUIDITY_THRESHOLD = 5000
 MEDIUM_LIQUIDITY_THRESHOLD = 100000
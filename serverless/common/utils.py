@@ -4,71 +4,270 @@ Utility functions for the Polymarket Watcher
 
 import json
 import re
+import zlib
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from decimal import Decimal
+from decimal import Context, Decimal
+from functools import lru_cache
+from operator import itemgetter
 import time
 
 import boto3
-from boto3.dynamodb.conditions import Key
+import requests
+from botocore.config import Config
+from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.types import TypeDeserializer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from .config import (
+    POLYMARKET_API_URL,
     CATEGORIES_OF_INTEREST,
-    VOLATILITY_THRESHOLDS,
     LOW_LIQUIDITY_THRESHOLD,
     MEDIUM_LIQUIDITY_THRESHOLD,
     HIGH_LIQUIDITY_THRESHOLD,
     LIQUIDITY_VOLATILITY_ADJUSTMENTS,
     MARKETS_TABLE,
-    HISTORICAL_TABLE,
+    MARKETS_ACTIVE_INDEX,
+    ACTIVE_MARKET_FLAG,
+    ACTIVE_MARKET_MAX_AGE_MINUTES,
     POSTS_TABLE,
+    POSTS_TIME_INDEX,
+    POSTS_INDEX_PARTITION,
+    INDEX_SHARD_COUNT,
     TTL_DAYS,
     SIGNALS_TABLE,
     RESOLUTIONS_TABLE,
     SIGNAL_TYPES
 )
 
+# Shared by every DynamoDB client: enough pooled connections for the thread
+# pools, adaptive retries to absorb throttling, and fail-fast timeouts
+DYNAMODB_CLIENT_CONFIG = Config(
+    max_pool_connections=32,
+    retries={'max_attempts': 5, 'mode': 'adaptive'},
+    tcp_keepalive=True,
+    connect_timeout=2,
+    read_timeout=5
+)
+
+@lru_cache(maxsize=None)
 def get_dynamodb_client():
-    """Initialize DynamoDB client"""
-    return boto3.resource('dynamodb')
+    """Initialize DynamoDB client (once per execution environment)"""
+    return boto3.resource('dynamodb', config=DYNAMODB_CLIENT_CONFIG)
+
+@lru_cache(maxsize=None)
+def get_table(table_name):
+    """Get a DynamoDB table handle, reused across invocations"""
+    return get_dynamodb_client().Table(table_name)
+
+@lru_cache(maxsize=None)
+def get_dynamodb_low_level_client():
+    """
+    Initialize a plain DynamoDB client (once per execution environment)
+    Returns raw attribute values; pair with deserialize_item
+    """
+    return boto3.client('dynamodb', config=DYNAMODB_CLIENT_CONFIG)
+
+class FloatDeserializer(TypeDeserializer):
+    """Deserialize DynamoDB numbers straight to float instead of Decimal"""
+    
+    def _deserialize_n(self, value):
+        return float(value)
+
+_float_deserializer = FloatDeserializer()
+
+def deserialize_item(item):
+    """Convert a raw DynamoDB item into a dict of Python values, numbers as floats"""
+    return {key: _float_deserializer.deserialize(value) for key, value in item.items()}
+
+@lru_cache(maxsize=None)
+def get_sns_client():
+    """Initialize SNS client (once per execution environment)"""
+    return boto3.client(
+        'sns',
+        config=Config(retries={'max_attempts': 3, 'mode': 'adaptive'})
+    )
+
+@lru_cache(maxsize=None)
+def get_http_session():
+    """
+    Initialize an HTTP session (once per execution environment)
+    Keeps connections alive across requests and warm invocations; retries back
+    off on throttling and transient server errors
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET']
+    )
+    session.mount('https://', HTTPAdapter(pool_maxsize=16, max_retries=retry))
+    return session
+
+def parallel_scan(table_name, total_segments=8, **scan_kwargs):
+    """
+    Scan a table as several segments read concurrently
+    Returns the items from every segment
+    
+    Args:
+        table_name: Name of the DynamoDB table to scan
+        total_segments: Number of segments (and worker threads)
+        scan_kwargs: Extra arguments passed to every scan call
+    """
+    # Table resources aren't thread-safe, so the workers share the resource's
+    # client instead (it still accepts condition objects and returns Python values)
+    client = get_dynamodb_client().meta.client
+    
+    def scan_segment(segment):
+        response = client.scan(
+            TableName=table_name,
+            Segment=segment,
+            TotalSegments=total_segments,
+            **scan_kwargs
+        )
+        items = response.get('Items', [])
+        
+        while 'LastEvaluatedKey' in response:
+            response = client.scan(
+                TableName=table_name,
+                Segment=segment,
+                TotalSegments=total_segments,
+                ExclusiveStartKey=response['LastEvaluatedKey'],
+                **scan_kwargs
+            )
+            items.extend(response.get('Items', []))
+        
+        return items
+    
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        segments = list(executor.map(scan_segment, range(total_segments)))
+    
+    return [item for items in segments for item in items]
+
+def fetch_market_pages(params, limit=100, max_workers=8):
+    """
+    Fetch every page of markets matching params from the Polymarket API
+    The first page is fetched alone; while pages come back full, the next
+    max_workers pages are requested in parallel
+    
+    Args:
+        params: Query parameters for the markets endpoint (without limit/offset)
+        limit: Page size
+        max_workers: Number of pages requested at once after the first
+    """
+    all_markets = []
+    session = get_http_session()
+    
+    def fetch_page(offset):
+        response = session.get(
+            POLYMARKET_API_URL,
+            params={**params, 'limit': limit, 'offset': offset},
+            timeout=10
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        offsets = [0]
+        
+        while True:
+            print(f"Fetching markets with offsets {offsets[0]}-{offsets[-1]}...")
+            try:
+                pages = list(executor.map(fetch_page, offsets))
+            except Exception as e:
+                print(f"Error fetching markets: {e}")
+                break
+            
+            # Keep pages up to and including the first short one, which
+            # marks the end of the results
+            reached_end = False
+            for page in pages:
+                all_markets.extend(page)
+                if len(page) < limit:
+                    reached_end = True
+                    break
+            
+            if reached_end:
+                break
+            
+            next_offset = offsets[-1] + limit
+            offsets = [next_offset + i * limit for i in range(max_workers)]
+    
+    return all_markets
+
+def build_trie_regex(words):
+    """
+    Build a regex alternation matching any of words, factored as a prefix trie
+    so the engine never re-tests a shared prefix (e.g. "eth" / "ethereum")
+    """
+    # Nested dicts keyed by character; '' marks the end of a word
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def to_regex(node):
+        ends_here = '' in node
+        branches = [re.escape(char) + to_regex(child) for char, child in sorted(node.items()) if char]
+        
+        if not branches:
+            return ''
+        
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if ends_here:
+            # Optional suffix, tried greedily so the longer word wins
+            return '(?:' + body + ')?'
+        return body
+    
+    return to_regex(trie)
+
+# Every category's keywords in one pattern, one named group per category, so
+# a single pass over the text finds all matching categories
+_CATEGORY_GROUPS = {f'category_{i}': category for i, category in enumerate(CATEGORIES_OF_INTEREST)}
+_CATEGORY_PATTERN = re.compile(
+    r'\b(?:' + '|'.join(
+        f'(?P<{group}>' + build_trie_regex(keyword.lower() for keyword in CATEGORIES_OF_INTEREST[category]) + ')'
+        for group, category in _CATEGORY_GROUPS.items()
+    ) + r')\b'
+)
 
 def categorize_market(market):
     """
     Categorize a market based on its question and description
     Returns a list of categories that match
     """
-    categories = []
-    
-    # Get the market question and description
-    question = market.get('question', '').lower()
-    description = market.get('description', '').lower()
-    
+    return list(categorize_text(market.get('question', ''), market.get('description', '')))
+
+@lru_cache(maxsize=4096)
+def categorize_text(question, description):
+    """
+    Get the categories matching a question and description, as a tuple
+    Cached, since each collection run sees mostly the same markets as the
+    previous run in a warm execution environment
+    """
     # Combine question and description for searching
-    text = f"{question} {description}"
+    text = f"{question.lower()} {description.lower()}"
     
-    # Check for each category of interest
-    for category, keywords in CATEGORIES_OF_INTEREST.items():
-        for keyword in keywords:
-            # Use word boundary to avoid partial matches
-            pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
-            if re.search(pattern, text):
-                categories.append(category)
-                break  # Once we've matched a category, no need to check other keywords
+    # Word boundaries in the pattern avoid partial matches
+    matched_groups = {match.lastgroup for match in _CATEGORY_PATTERN.finditer(text)}
     
-    return list(set(categories))  # Remove duplicates
+    return tuple(_CATEGORY_GROUPS[group] for group in _CATEGORY_GROUPS if group in matched_groups)
+
+# Liquidity tier lower bounds (sorted) and the tiers they separate, for bisect lookups
+_LIQUIDITY_TIER_BOUNDS = (LOW_LIQUIDITY_THRESHOLD, MEDIUM_LIQUIDITY_THRESHOLD, HIGH_LIQUIDITY_THRESHOLD)
+_LIQUIDITY_TIERS = ('very_low', 'low', 'medium', 'high')
 
 def get_liquidity_tier(liquidity):
     """
     Determine the liquidity tier of a market
     Returns one of: 'very_low', 'low', 'medium', 'high'
     """
-    if liquidity < LOW_LIQUIDITY_THRESHOLD:
-        return 'very_low'
-    elif liquidity < MEDIUM_LIQUIDITY_THRESHOLD:
-        return 'low'
-    elif liquidity < HIGH_LIQUIDITY_THRESHOLD:
-        return 'medium'
-    else:
-        return 'high'
+    return _LIQUIDITY_TIERS[bisect_right(_LIQUIDITY_TIER_BOUNDS, liquidity)]
 
 def should_track_market(market):
     """
@@ -85,12 +284,10 @@ def should_track_market(market):
     if LIQUIDITY_VOLATILITY_ADJUSTMENTS[tier]['ignore']:
         return False
     
-    # Check if market has at least one category of interest
-    categories = categorize_market(market)
-    if not categories:
-        return False
-    
-    return True
+    # Check if market has at least one category of interest; the first
+    # keyword match is enough, so don't enumerate every category
+    text = f"{market.get('question', '').lower()} {market.get('description', '').lower()}"
+    return _CATEGORY_PATTERN.search(text) is not None
 
 def calculate_price_change(current_price, previous_price):
     """
@@ -143,27 +340,28 @@ def calculate_significant_price_change(current_price, previous_price, min_absolu
     
     return (False, max(absolute_change, relative_change), 'relative')
 
+def load_json_list(value):
+    """
+    Decode a JSON-encoded list field from the API
+    The API sends these as strings, so decoding is tried first; values that
+    are already lists pass through, anything else becomes an empty list
+    """
+    try:
+        return json.loads(value)
+    except TypeError:
+        return value if isinstance(value, list) else []
+
 def parse_outcomes_and_prices(market):
     """Parse outcomes and prices from market data"""
-    outcomes = []
-    prices = []
-    
     try:
-        # Parse outcomes
-        if isinstance(market.get('outcomes'), str):
-            outcomes = json.loads(market.get('outcomes', '[]'))
-        elif isinstance(market.get('outcomes'), list):
-            outcomes = market.get('outcomes')
-            
-        # Parse outcome prices
-        if isinstance(market.get('outcomePrices'), str):
-            prices = json.loads(market.get('outcomePrices', '[]'))
-        elif isinstance(market.get('outcomePrices'), list):
-            prices = market.get('outcomePrices')
-            
+        # Parse outcomes and outcome prices
+        outcomes = load_json_list(market.get('outcomes'))
+        prices = load_json_list(market.get('outcomePrices'))
+        
         # Convert prices to float
         prices = [float(price) for price in prices]
-    except (json.JSONDecodeError, ValueError):
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"Error parsing outcomes/prices for market {market.get('id')}: {e}")
         return [], []
         
     return outcomes, prices
@@ -184,9 +382,9 @@ def get_tracked_outcome_and_price(market):
         yes_index = outcomes.index("Yes")
         return outcomes[yes_index], prices[yes_index], yes_index
     else:
-        # Multi-outcome market - track highest probability outcome
-        max_index = prices.index(max(prices))
-        return outcomes[max_index], prices[max_index], max_index
+        # Multi-outcome market - track highest probability outcome (one pass)
+        max_index, max_price = max(enumerate(prices), key=itemgetter(1))
+        return outcomes[max_index], max_price, max_index
 
 def get_previous_price(market_id, outcome_index, table_name=MARKETS_TABLE):
     """
@@ -194,12 +392,12 @@ def get_previous_price(market_id, outcome_index, table_name=MARKETS_TABLE):
     """
     try:
         # Initialize DynamoDB
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(table_name)
+        table = get_table(table_name)
         
-        # Get the item
+        # Get only the attributes compared below
         response = table.get_item(
-            Key={'id': market_id}
+            Key={'id': market_id},
+            ProjectionExpression='outcome_index, current_price'
         )
         
         if 'Item' in response:
@@ -213,44 +411,56 @@ def get_previous_price(market_id, outcome_index, table_name=MARKETS_TABLE):
         print(f"Error getting previous price from DynamoDB: {e}")
         return None
 
+def build_post_item(market_id, post_content, idx):
+    """
+    Build the DynamoDB record for a post
+    
+    Args:
+        market_id: ID of the market that was posted about
+        post_content: Text of the post
+        idx: Position of the market in its update (only the first is tweeted)
+    """
+    # Generate a unique post ID
+    post_id = f"post_{int(time.time())}_{market_id}"
+    
+    # Current timestamp
+    now = datetime.now(timezone.utc)
+    timestamp = now.isoformat()
+    sortable_timestamp = now.strftime("%Y%m%d%H%M%S")
+    
+    # Create post record
+    return {
+        'id': post_id,
+        'content': post_content,
+        'market_id': str(market_id),
+        'posted_at': timestamp,
+        'gsi_pk': POSTS_INDEX_PARTITION,
+        'sortable_timestamp': sortable_timestamp,
+        'posted_automatically': idx == 0
+    }
+
 def save_post_to_dynamodb(market_id, post_content, idx):
     """
     Save a post record to DynamoDB
     
     Args:
         market_id: ID of the market that was posted about
-        tweet_id: ID of the tweet that was posted
+        post_content: Text of the post
+        idx: Position of the market in its update (only the first is tweeted)
         
     Returns:
         The DynamoDB item that was created
     """
     try:
         # Initialize DynamoDB
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(POSTS_TABLE)
-        
-        # Generate a unique post ID
-        post_id = f"post_{int(time.time())}_{market_id}"
-        
-        # Current timestamp
-        now = datetime.now(timezone.utc)
-        timestamp = now.isoformat()
-        sortable_timestamp = now.strftime("%Y%m%d%H%M%S")
-        
-        # Create post record
-        post_item = {
-            'id': post_id,
-            'content': post_content,
-            'market_id': str(market_id),
-            'posted_at': timestamp,
-            'sortable_timestamp': sortable_timestamp,
-            'posted_automatically': idx == 0
-        }
+        table = get_table(POSTS_TABLE)
+        
+        post_item = build_post_item(market_id, post_content, idx)
         
         # Save to DynamoDB
         table.put_item(Item=post_item)
         
-        print(f"Saved post record to DynamoDB: {post_id}")
+        print(f"Saved post record to DynamoDB: {post_item['id']}")
         
         return post_item
     except Exception as e:
@@ -264,32 +474,27 @@ def get_last_post_time(market_id=None, table_name=POSTS_TABLE):
     """
     try:
         # Initialize DynamoDB
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(table_name)
+        table = get_table(table_name)
         
         if market_id:
-            # Get the last post for a specific market
+            # Get the last post for a specific market (sorted by posted_at)
             response = table.query(
-                KeyConditionExpression=Key('id').eq(market_id),
+                KeyConditionExpression=Key('market_id').eq(str(market_id)),
+                ProjectionExpression='posted_at',
                 ScanIndexForward=False,  # descending order
                 Limit=1
             )
         else:
-            # Get the last post for any market
-            response = table.scan(
-                Limit=10,
-                ScanIndexForward=False  # descending order
+            # Get the last post for any market from the time index
+            response = table.query(
+                IndexName=POSTS_TIME_INDEX,
+                KeyConditionExpression=Key('gsi_pk').eq(POSTS_INDEX_PARTITION),
+                ScanIndexForward=False,  # descending order
+                Limit=1
             )
-            
-            # Sort by timestamp
-            if 'Items' in response:
-                response['Items'].sort(
-                    key=lambda x: x.get('timestamp', ''),
-                    reverse=True
-                )
         
         if 'Items' in response and response['Items']:
-            return response['Items'][0].get('timestamp')
+            return response['Items'][0].get('posted_at')
         
         return None
     except Exception as e:
@@ -323,45 +528,118 @@ class DecimalEncoder(json.JSONEncoder):
             return float(o)
         return super(DecimalEncoder, self).default(o)
 
+def map_leaves(obj, convert):
+    """
+    Copy nested dicts/lists, replacing every non-container value with
+    convert(value)
+    Walks with an explicit stack instead of recursing once per node
+    """
+    # Each stack entry is a (container, key) slot whose value still needs converting
+    root = [obj]
+    stack = [(root, 0)]
+    
+    while stack:
+        container, key = stack.pop()
+        value = container[key]
+        
+        # Exact type checks first; subclasses fall through to isinstance
+        value_type = type(value)
+        if value_type is dict or isinstance(value, dict):
+            value = container[key] = dict(value)
+            stack.extend((value, k) for k in value)
+        elif value_type is list or isinstance(value, list):
+            value = container[key] = list(value)
+            stack.extend((value, i) for i in range(len(value)))
+        else:
+            container[key] = convert(value)
+    
+    return root[0]
+
+def _decimal_leaf_to_float(value):
+    """Convert a single Decimal to float, leaving other values as is"""
+    return float(value) if isinstance(value, Decimal) else value
+
 def decimal_to_float(obj):
     """Convert Decimal values to float in a dictionary"""
-    if isinstance(obj, dict):
-        return {k: decimal_to_float(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [decimal_to_float(i) for i in obj]
-    elif isinstance(obj, Decimal):
-        return float(obj)
-    else:
-        return obj
+    return map_leaves(obj, _decimal_leaf_to_float)
+
+def get_time_bucket(timestamp):
+    """
+    Get the hour bucket for an ISO-8601 timestamp, e.g. '2024-05-01T14'
+    Used as the partition key of time-bucketed indexes
+    """
+    return timestamp[:13]
+
+def get_index_shard_key(value, market_id):
+    """
+    Get the sharded form of an index partition value for a market, e.g. '2024-05-01T14#3'
+    Spreads a collection burst over INDEX_SHARD_COUNT partitions; a market
+    always lands in the same shard, so its rows stay in timestamp order
+    """
+    # crc32 rather than hash(), which is salted per process
+    shard = zlib.crc32(str(market_id).encode()) % INDEX_SHARD_COUNT
+    return f"{value}#{shard}"
+
+def get_index_shard_keys(value):
+    """Get every sharded form of an index partition value, for readers to fan out over"""
+    return [f"{value}#{shard}" for shard in range(INDEX_SHARD_COUNT)]
+
+def get_time_buckets(start, end=None):
+    """
+    Get the hour buckets covering start through end (default: now), oldest first
+    """
+    end = end or datetime.now(timezone.utc)
+    bucket = start.replace(minute=0, second=0, microsecond=0)
+    
+    buckets = []
+    while bucket <= end:
+        buckets.append(get_time_bucket(bucket.isoformat()))
+        bucket += timedelta(hours=1)
+    
+    return buckets
 
 def calculate_ttl(days):
     """Calculate TTL timestamp for DynamoDB"""
-    return int((datetime.utcnow() + timedelta(days=days)).timestamp())
+    return int(time.time()) + days * 86400
 
-def prepare_for_dynamodb(item):
-    """Prepare an item for DynamoDB by converting values to appropriate types"""
-    if isinstance(item, dict):
-        return {k: prepare_for_dynamodb(v) for k, v in item.items()}
-    elif isinstance(item, list):
-        return [prepare_for_dynamodb(i) for i in item]
+# Converting straight from the float skips the str() round trip; 15 significant
+# digits keeps everything meaningful in a price or volume and drops float noise
+# such as 0.30000000000000004
+_DECIMAL_CONTEXT = Context(prec=15)
+
+def to_decimal(value):
+    """Convert a number (or numeric string) to a Decimal for DynamoDB"""
+    return _DECIMAL_CONTEXT.create_decimal_from_float(float(value))
+
+def _prepare_leaf_for_dynamodb(item):
+    """Convert a single non-container value to a DynamoDB-compatible type"""
+    # Exact type checks for the common leaf values skip the isinstance ladder
+    item_type = type(item)
+    if item_type is str or item_type is int or item_type is bool:
+        return item
     elif isinstance(item, float):
-        return Decimal(str(item))
-    elif isinstance(item, bool):
-        return bool(item)
+        return to_decimal(item)
     elif isinstance(item, (int, str)):
         return item
     else:
         return str(item)
 
+def prepare_for_dynamodb(item):
+    """Prepare an item for DynamoDB by converting values to appropriate types"""
+    return map_leaves(item, _prepare_leaf_for_dynamodb)
+
+# Each liquidity tier's volatility threshold, aligned with _LIQUIDITY_TIERS
+_TIER_VOLATILITY_THRESHOLDS = [
+    LIQUIDITY_VOLATILITY_ADJUSTMENTS[tier]['threshold']
+    for tier in _LIQUIDITY_TIERS
+]
+
 def get_volatility_threshold(liquidity):
     """
     Get the appropriate volatility threshold based on liquidity
     """
-    # Get liquidity tier
-    tier = get_liquidity_tier(liquidity)
-    
-    # Return threshold based on tier
-    return LIQUIDITY_VOLATILITY_ADJUSTMENTS[tier]['threshold']
+    # Index of the liquidity tier, same boundaries as get_liquidity_tier
+    return _TIER_VOLATILITY_THRESHOLDS[bisect_right(_LIQUIDITY_TIER_BOUNDS, liquidity)]
 
 def calculate_standard_deviation(values):
     """
@@ -393,8 +671,7 @@ def get_signal_by_id(signal_id, market_id):
     Get a signal by its ID and market ID
     """
     try:
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(SIGNALS_TABLE)
+        table = get_table(SIGNALS_TABLE)
         
         response = table.get_item(
             Key={
@@ -416,15 +693,16 @@ def get_resolution_by_market_id(market_id):
     Get resolution data for a market
     """
     try:
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(RESOLUTIONS_TABLE)
+        table = get_table(RESOLUTIONS_TABLE)
         
-        response = table.get_item(
-            Key={'market_id': market_id}
+        # Resolutions are keyed by (market_id, resolution_timestamp)
+        response = table.query(
+            KeyConditionExpression=Key('market_id').eq(market_id),
+            Limit=1
         )
         
-        if 'Item' in response:
-            return response['Item']
+        if response.get('Items'):
+            return response['Items'][0]
         
         return None
     except Exception as e:
@@ -439,33 +717,23 @@ def calculate_signal_accuracy_metrics(category=None, liquidity_tier=None):
         dict: Dictionary with accuracy metrics
     """
     try:
-        dynamodb = get_dynamodb_client()
-        signals_table = dynamodb.Table(SIGNALS_TABLE)
-        
         # Build filter expression
         filter_expression = Attr('actual_outcome').exists()
         
         if category:
-            filter_expression = filter_expression & Attr('category').eq(category)
+            # Signals store every category of their market in a list
+            filter_expression = filter_expression & Attr('categories').contains(category)
         
         if liquidity_tier:
             filter_expression = filter_expression & Attr('liquidity_tier').eq(liquidity_tier)
         
-        # Query signals with resolutions
-        response = signals_table.scan(
-            FilterExpression=filter_expression
+        # Scan for signals with resolutions, reading only the fields tallied below
+        signals = parallel_scan(
+            SIGNALS_TABLE,
+            FilterExpression=filter_expression,
+            ProjectionExpression='signal_type, was_correct'
         )
         
-        signals = response.get('Items', [])
-        
-        # Handle pagination
-        while 'LastEvaluatedKey' in response:
-            response = signals_table.scan(
-                FilterExpression=filter_expression,
-                ExclusiveStartKey=response['LastEvaluatedKey']
-            )
-            signals.extend(response.get('Items', []))
-        
         # Calculate metrics
         if not signals:
             return {
@@ -520,7 +788,8 @@ def batch_write_to_dynamodb(items, table_name):
         return True
         
     try:
-        dynamodb = boto3.resource('dynamodb')
+        # Shared client, so the batches reuse its pooled connections
+        client = get_dynamodb_client().meta.client
         
         # Process in batches of 25 (DynamoDB batch write limit)
         for i in range(0, len(items), 25):
@@ -530,15 +799,17 @@ def batch_write_to_dynamodb(items, table_name):
                 ]
             }
             
-            response = dynamodb.meta.client.batch_write_item(RequestItems=batch)
+            response = client.batch_write_item(RequestItems=batch)
             unprocessed = response.get('UnprocessedItems', {})
             
-            # Retry unprocessed items
+            # Retry unprocessed items, backing off exponentially so throttled
+            # partitions get a chance to recover
             retry_count = 0
             max_retries = 3
             while unprocessed.get(table_name) and retry_count < max_retries:
                 print(f"Retrying {len(unprocessed[table_name])} unprocessed items...")
-                response = dynamodb.meta.client.batch_write_item(RequestItems=unprocessed)
+                time.sleep(0.1 * 2 ** retry_count)
+                response = client.batch_write_item(RequestItems=unprocessed)
                 unprocessed = response.get('UnprocessedItems', {})
                 retry_count += 1
                 
@@ -548,4 +819,45 @@ def batch_write_to_dynamodb(items, table_name):
         return True
     except Exception as e:
         print(f"Error in batch_write_to_dynamodb: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def get_active_markets(max_age_minutes=ACTIVE_MARKET_MAX_AGE_MINUTES):
+    """
+    Get the markets refreshed by recent collections
+    Reads the active-markets index, which projects only the attributes the
+    analyzers use
+    """
+    try:
+        client = get_dynamodb_low_level_client()
+        
+        # Calculate timestamp for the oldest refresh still considered active
+        cutoff = (datetime.now(timezone.utc) - timedelta(minutes=max_age_minutes)).isoformat()
+        
+        items = []
+        
+        # Every shard of the active flag holds a disjoint slice of the markets
+        for active_key in get_index_shard_keys(ACTIVE_MARKET_FLAG):
+            query_kwargs = {
+                'TableName': MARKETS_TABLE,
+                'IndexName': MARKETS_ACTIVE_INDEX,
+                'KeyConditionExpression': '#active = :active AND last_updated > :cutoff',
+                'ExpressionAttributeNames': {'#active': 'active'},
+                'ExpressionAttributeValues': {
+                    ':active': {'S': active_key},
+                    ':cutoff': {'S': cutoff}
+                }
+            }
+            response = client.query(**query_kwargs)
+            items.extend(deserialize_item(item) for item in response.get('Items', []))
+            
+            while 'LastEvaluatedKey' in response:
+                response = client.query(
+                    ExclusiveStartKey=response['LastEvaluatedKey'],
+                    **query_kwargs
+                )
+                items.extend(deserialize_item(item) for item in response.get('Items', []))
+        
+        return items
+    except Exception as e:
+        print(f"Error getting markets from DynamoDB: {e}")
+        return []
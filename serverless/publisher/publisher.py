@@ -2,38 +2,51 @@
 Polymarket Watcher - Publisher Lambda
 
 This Lambda function publishes market updates to Twitter.
-It is triggered by SNS messages from the analyzer Lambda.
+It is triggered by batches of the analyzer's SNS messages, delivered
+through an SQS queue.
 """
 
 import json
 import os
 import time
-from datetime import datetime, timezone
+from functools import lru_cache
 import tweepy
-from decimal import Decimal
 
 import boto3
 from botocore.exceptions import ClientError
 
-from common.config import (
-    POSTS_TABLE,
-    POLYMARKET_URL,
-    SIGNALS_TABLE
-)
-from common.utils import save_post_to_dynamodb, get_dynamodb_client
+from common.config import POLYMARKET_URL, POSTS_TABLE
+from common.utils import build_post_item, batch_write_to_dynamodb, get_dynamodb_client
 
-# Get Twitter API Secret ARNs from environment
-# Get Twitter API Secret Names from environment
-X_ACCESS_TOKEN_SECRET_NAME = os.environ.get('X_ACCESS_TOKEN_SECRET_NAME', 'polymarket/x-access-token')
-X_ACCESS_TOKEN_SECRET_SECRET_NAME = os.environ.get('X_ACCESS_TOKEN_SECRET_SECRET_NAME', 'polymarket/x-access-token-secret')
-X_CONSUMER_KEY_SECRET_NAME = os.environ.get('X_CONSUMER_KEY_SECRET_NAME', 'polymarket/x-consumer-key')
-X_CONSUMER_SECRET_SECRET_NAME = os.environ.get('X_CONSUMER_SECRET_SECRET_NAME', 'polymarket/x-consumer-secret')
+# Get Twitter API credentials secret name from environment
+X_CREDENTIALS_SECRET_NAME = os.environ.get('X_CREDENTIALS_SECRET_NAME', 'polymarket/x-credentials')
+
+# Seconds a warm execution environment reuses fetched credentials before
+# re-reading the secret (picks up rotated credentials without a redeploy)
+X_CREDENTIALS_TTL_SECONDS = int(os.environ.get('X_CREDENTIALS_TTL_SECONDS', '3600'))
+
+# Credentials cached per execution environment, with the time they were fetched
+_twitter_credentials = None
+_twitter_credentials_fetched_at = 0
+
+# Client built from the cached credentials, shared by every tweet in a batch
+_twitter_client = None
+_twitter_client_credentials = None
+
+@lru_cache(maxsize=None)
+def get_secrets_manager_client():
+    """Initialize Secrets Manager client (once per execution environment)"""
+    return boto3.client(service_name='secretsmanager', region_name = 'us-east-1')
+
+# Build the AWS clients during init so warm invocations reuse them
+get_secrets_manager_client()
+get_dynamodb_client()
 
 def get_secret_value(secret_name):
     """Retrieve a secret value from AWS Secrets Manager"""
     try:
-        # Create a Secrets Manager client
-        client = boto3.client(service_name='secretsmanager', region_name = 'us-east-1')
+        # Get the shared Secrets Manager client
+        client = get_secrets_manager_client()
         
         # Get the secret value
         response = client.get_secret_value(SecretId=secret_name)
@@ -49,31 +62,43 @@ def get_secret_value(secret_name):
 
 def get_twitter_credentials():
     """Retrieve Twitter API credentials from AWS Secrets Manager"""
+    global _twitter_credentials, _twitter_credentials_fetched_at
+    
+    if _twitter_credentials and time.time() - _twitter_credentials_fetched_at < X_CREDENTIALS_TTL_SECONDS:
+        return _twitter_credentials
+    
     try:
-        # Get credentials from Secrets Manager
-        access_token = get_secret_value(X_ACCESS_TOKEN_SECRET_NAME)
-        access_token_secret = get_secret_value(X_ACCESS_TOKEN_SECRET_SECRET_NAME)
-        consumer_key = get_secret_value(X_CONSUMER_KEY_SECRET_NAME)
-        consumer_secret = get_secret_value(X_CONSUMER_SECRET_SECRET_NAME)
+        # All four credentials live in one JSON secret
+        secret_string = get_secret_value(X_CREDENTIALS_SECRET_NAME)
         
-        # Check if all credentials were retrieved successfully
-        if not all([access_token, access_token_secret, consumer_key, consumer_secret]):
+        if not secret_string:
             print("Failed to retrieve Twitter API credentials from Secrets Manager")
             return None
         
-        # Return credentials
-        return {
-            'access_token': access_token,
-            'access_token_secret': access_token_secret,
-            'consumer_key': consumer_key,
-            'consumer_secret': consumer_secret
+        secret = json.loads(secret_string)
+        credentials = {
+            'access_token': secret.get('access_token'),
+            'access_token_secret': secret.get('access_token_secret'),
+            'consumer_key': secret.get('consumer_key'),
+            'consumer_secret': secret.get('consumer_secret')
         }
+        
+        # Check if all credentials were retrieved successfully
+        if not all(credentials.values()):
+            print("Twitter API credentials secret is missing one or more keys")
+            return None
+        
+        _twitter_credentials = credentials
+        _twitter_credentials_fetched_at = time.time()
+        return credentials
     except Exception as e:
         print(f"Error retrieving Twitter credentials: {e}")
         return None
 
 def get_twitter_client():
     """Initialize and return a Twitter API client"""
+    global _twitter_client, _twitter_client_credentials
+    
     try:
         # Get Twitter API credentials
         credentials = get_twitter_credentials()
@@ -82,6 +107,10 @@ def get_twitter_client():
             print("Failed to retrieve Twitter API credentials")
             return None
         
+        # Reuse the client until the credentials are re-read
+        if _twitter_client and credentials is _twitter_client_credentials:
+            return _twitter_client
+        
         # Initialize Twitter client
         client = tweepy.Client(
             consumer_key=credentials['consumer_key'],
@@ -92,6 +121,8 @@ def get_twitter_client():
         
         print("Twitter API client initialized successfully")
         
+        _twitter_client = client
+        _twitter_client_credentials = credentials
         return client
     except Exception as e:
         print(f"Error initializing Twitter client: {e}")
@@ -161,7 +192,7 @@ def post_to_twitter(market_update, idx):
             
             if not twitter:
                 print("Failed to initialize Twitter client")
-                return None
+                return None, None
             
             # Post to Twitter
             tweet = twitter.create_tweet(text = post_text)
@@ -182,20 +213,23 @@ def lambda_handler(event, context):
     
     start_time = time.time()
     
-    # Parse event body
-    market_updates = []
+    # Parse event body. SQS records carry the analyzer's message as the raw
+    # body; direct SNS records (local runs) wrap it in Sns.Message.
+    messages = []
     for record in event.get('Records', []):
-        # Extract the SNS message
-        sns_message_str = record.get('Sns', {}).get('Message', '{}')
+        if 'Sns' in record:
+            message_str = record['Sns'].get('Message', '{}')
+        else:
+            message_str = record.get('body', '{}')
         try:
-            message = json.loads(sns_message_str)
-            market_updates.extend(message.get('markets', []))
+            message = json.loads(message_str)
+            messages.append((record.get('messageId'), message.get('markets', [])))
         except Exception as e:
-            print(f"Error parsing SNS message: {e}")
+            print(f"Error parsing market movements message: {e}")
 
-    print(f'Captured {len(market_updates)} markets.')
+    print(f'Captured {sum(len(updates) for _, updates in messages)} markets from {len(messages)} messages.')
     
-    if not market_updates:
+    if not any(updates for _, updates in messages):
         return {
             'statusCode': 200,
             'body': json.dumps({
@@ -205,20 +239,34 @@ def lambda_handler(event, context):
     
     # Process each market update
     posts_made = []
+    batch_item_failures = []
     
-    for idx, market_update in enumerate(market_updates):
-        # Post to Twitter
-        post_successful, post_content = post_to_twitter(market_update, idx)
-        
-        if post_successful:
-            # Save post to DynamoDB
-            post_record = save_post_to_dynamodb(market_update['id'], post_content, idx)
+    post_items = []
+    
+    for message_id, market_updates in messages:
+        for idx, market_update in enumerate(market_updates):
+            # Post to Twitter
+            post_successful, post_content = post_to_twitter(market_update, idx)
             
-            posts_made.append({
-                'market_id': market_update['id'],
-                'question': market_update['question'],
-                'confidence_score': market_update.get('confidence_score', 0.5)
-            })
+            if post_successful:
+                # Collect the post record for the batch write below
+                post_items.append(build_post_item(market_update['id'], post_content, idx))
+                
+                posts_made.append({
+                    'market_id': market_update['id'],
+                    'question': market_update['question'],
+                    'confidence_score': market_update.get('confidence_score', 0.5)
+                })
+            elif idx == 0 and message_id:
+                # The tweet itself failed; let SQS redeliver the message
+                batch_item_failures.append({'itemIdentifier': message_id})
+                break
+    
+    # Save every post record in as few requests as possible
+    if batch_write_to_dynamodb(post_items, POSTS_TABLE):
+        print(f"Saved {len(post_items)} post records to DynamoDB")
+    else:
+        print("Failed to save post records to DynamoDB")
     
     execution_time = time.time() - start_time
     
@@ -228,7 +276,8 @@ def lambda_handler(event, context):
             'message': f'Published {len(posts_made)} market updates',
             'posts_made': posts_made,
             'execution_time': f'{execution_time:.2f} seconds'
-        })
+        }),
+        'batchItemFailures': batch_item_failures
     }
 
 if __name__ == "__main__":
@@ -6,75 +6,48 @@ It tracks market resolutions and correlates them with previously detected signal
 """
 
 import json
-import os
 import time
 from datetime import datetime, timezone, timedelta
-from decimal import Decimal
 
-import boto3
-import requests
-from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.conditions import Key
 
 from common.config import (
-    POLYMARKET_API_URL,
     MARKETS_TABLE,
     RESOLUTIONS_TABLE,
     SIGNALS_TABLE,
-    TTL_DAYS,
-    RESOLUTION_STATUS
+    TTL_DAYS
 )
 from common.utils import (
-    get_dynamodb_client,
+    get_table,
     categorize_market,
-    batch_write_to_dynamodb,
-    get_tracked_outcome_and_price,
     calculate_ttl,
-    parse_outcomes_and_prices
+    parse_outcomes_and_prices,
+    fetch_market_pages,
+    batch_write_to_dynamodb,
+    to_decimal,
+    get_http_session
 )
 
+# Build the DynamoDB table handles and the HTTP session during init so warm
+# invocations (and SnapStart restores) reuse them
+get_table(RESOLUTIONS_TABLE)
+get_table(SIGNALS_TABLE)
+get_http_session()
+
 def fetch_resolved_markets(limit=100, days_lookback_max=1, days_lookback_min=14):
     """Fetch recently resolved markets from Polymarket API"""
-    all_markets = []
-    offset = 0
-    
     # Calculate the date range for recently resolved markets
     end_date_max = (datetime.now(timezone.utc) - timedelta(days=days_lookback_max)).strftime('%Y-%m-%d')
     end_date_min = (datetime.now(timezone.utc) - timedelta(days=days_lookback_min)).strftime('%Y-%m-%d')
     
-    while True:
-        params = {
-            'limit': limit,
-            'offset': offset,
-            'active': False,  # Get resolved markets
-            'ascending': False,
-            'end_date_max': end_date_max,
-            "end_date_min": end_date_min
-        }
-        
-        try:
-            print(f"Fetching resolved markets with offset {offset}...")
-            response = requests.get(POLYMARKET_API_URL, params=params)
-            response.raise_for_status()
-            
-            markets_data = response.json()
-            
-            # Check if we got any markets back
-            if not markets_data:
-                break
-                
-            # Add markets to our collection
-            all_markets.extend(markets_data)
-            
-            # If we got fewer markets than the limit, we've reached the end
-            if len(markets_data) < limit:
-                break
-                
-            # Increment offset for next batch
-            offset += len(markets_data)
-            
-        except Exception as e:
-            print(f"Error fetching resolved markets: {e}")
-            break
+    params = {
+        'active': False,  # Get resolved markets
+        'ascending': False,
+        'end_date_max': end_date_max,
+        "end_date_min": end_date_min
+    }
+    
+    all_markets = fetch_market_pages(params, limit=limit)
     
     print(f"Fetched a total of {len(all_markets)} resolved markets")
     return all_markets
@@ -82,8 +55,7 @@ def fetch_resolved_markets(limit=100, days_lookback_max=1, days_lookback_min=14)
 def get_market_from_dynamodb(market_id):
     """Get market data from DynamoDB"""
     try:
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(MARKETS_TABLE)
+        table = get_table(MARKETS_TABLE)
         
         response = table.get_item(
             Key={'id': market_id}
@@ -100,8 +72,7 @@ def get_market_from_dynamodb(market_id):
 def get_signals_for_market(market_id):
     """Get all signals for a specific market"""
     try:
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(SIGNALS_TABLE)
+        table = get_table(SIGNALS_TABLE)
         
         response = table.query(
             KeyConditionExpression=Key('market_id').eq(market_id)
@@ -170,8 +141,7 @@ def evaluate_signal_accuracy(signal, resolution_outcome):
 def update_signal_with_resolution(signal, resolution_outcome, was_correct):
     """Update a signal with resolution information"""
     try:
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(SIGNALS_TABLE)
+        table = get_table(SIGNALS_TABLE)
         
         response = table.update_item(
             Key={
@@ -192,47 +162,37 @@ def update_signal_with_resolution(signal, resolution_outcome, was_correct):
         print(f"Error updating signal with resolution: {e}")
         return False
 
-def save_resolution_to_dynamodb(market, resolution_outcome):
-    """Save market resolution data to DynamoDB"""
-    try:
-        market_id = market.get('id')
-        
-        # Get outcomes and prices
-        outcomes, prices = parse_outcomes_and_prices(market)
-        
-        # Convert prices to Decimal for DynamoDB
-        decimal_prices = [Decimal(str(p)) for p in prices]
-        
-        # Create a map of outcome to price
-        outcome_prices = {}
-        for i, outcome in enumerate(outcomes):
-            if i < len(decimal_prices):
-                outcome_prices[outcome] = decimal_prices[i]
-        
-        # Prepare resolution item for DynamoDB
-        resolution_item = {
-            'market_id': market_id,
-            'question': market.get('question'),
-            'resolution_outcome': resolution_outcome,
-            'resolution_timestamp': datetime.now(timezone.utc).isoformat(),
-            'resolution_date': market.get('endDate'),
-            'outcome_prices': outcome_prices,
-            'categories': categorize_market(market),
-            'liquidity': Decimal(str(market.get('liquidity', 0))),
-            'volume': Decimal(str(market.get('volume', 0))),
-            'ttl': calculate_ttl(TTL_DAYS['resolutions'])
-        }
-        
-        # Write to DynamoDB
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(RESOLUTIONS_TABLE)
-        
-        response = table.put_item(Item=resolution_item)
-        
-        return True
-    except Exception as e:
-        print(f"Error saving resolution to DynamoDB: {e}")
-        return False
+def build_resolution_item(market, resolution_outcome):
+    """Build the DynamoDB resolution item for a resolved market"""
+    market_id = market.get('id')
+    
+    # Get outcomes and prices
+    outcomes, prices = parse_outcomes_and_prices(market)
+    
+    # Convert prices to Decimal for DynamoDB
+    decimal_prices = [to_decimal(p) for p in prices]
+    
+    # Create a map of outcome to price
+    outcome_prices = {}
+    for i, outcome in enumerate(outcomes):
+        if i < len(decimal_prices):
+            outcome_prices[outcome] = decimal_prices[i]
+    
+    # Prepare resolution item for DynamoDB
+    resolution_item = {
+        'market_id': market_id,
+        'question': market.get('question'),
+        'resolution_outcome': resolution_outcome,
+        'resolution_timestamp': datetime.now(timezone.utc).isoformat(),
+        'resolution_date': market.get('endDate'),
+        'outcome_prices': outcome_prices,
+        'categories': categorize_market(market),
+        'liquidity': to_decimal(market.get('liquidity', 0)),
+        'volume': to_decimal(market.get('volume', 0)),
+        'ttl': calculate_ttl(TTL_DAYS['resolutions'])
+    }
+    
+    return resolution_item
 
 def process_resolved_markets(markets_data):
     """Process resolved market data and update signals"""
@@ -240,20 +200,30 @@ def process_resolved_markets(markets_data):
         return 0
     
     processed_count = 0
+    resolution_items = []
+    
+    # A market repeated across API pages would otherwise be resolved twice,
+    # since its first resolution isn't written until the batch at the end
+    seen_market_ids = set()
     
     for market in markets_data:
         try:
             market_id = market.get('id')
             
+            if market_id in seen_market_ids:
+                continue
+            seen_market_ids.add(market_id)
+            
             # Check if we already processed this resolution
-            dynamodb = get_dynamodb_client()
-            resolutions_table = dynamodb.Table(RESOLUTIONS_TABLE)
+            resolutions_table = get_table(RESOLUTIONS_TABLE)
             
-            response = resolutions_table.get_item(
-                Key={'market_id': market_id}
+            # Resolutions are keyed by (market_id, resolution_timestamp)
+            response = resolutions_table.query(
+                KeyConditionExpression=Key('market_id').eq(market_id),
+                Limit=1
             )
             
-            if 'Item' in response:
+            if response.get('Items'):
                 print(f"Market {market_id} already processed. Skipping.")
                 continue
             
@@ -264,9 +234,9 @@ def process_resolved_markets(markets_data):
                 print(f"Could not determine resolution outcome for market {market_id}. Skipping.")
                 continue
             
-            # Save resolution to DynamoDB
-            if save_resolution_to_dynamodb(market, resolution_outcome):
-                print(f"Saved resolution for market {market_id}: {resolution_outcome}")
+            # Collect the resolution for the batch write below
+            resolution_items.append(build_resolution_item(market, resolution_outcome))
+            print(f"Resolved market {market_id}: {resolution_outcome}")
             
             # Get signals for this market
             signals = get_signals_for_market(market_id)
@@ -283,6 +253,13 @@ def process_resolved_markets(markets_data):
         except Exception as e:
             print(f"Error processing resolved market {market.get('id')}: {e}")
     
+    # Save every resolution in as few requests as possible
+    if resolution_items:
+        if batch_write_to_dynamodb(resolution_items, RESOLUTIONS_TABLE):
+            print(f"Saved {len(resolution_items)} resolutions to DynamoDB")
+        else:
+            print("Failed to save resolutions to DynamoDB")
+    
     return processed_count
 
 def lambda_handler(event, context):
@@ -293,7 +270,7 @@ def lambda_handler(event, context):
     
     # Fetch resolved markets from Polymarket
     days_lookback = int(event.get('days_lookback_max', 1))
-    markets_data = fetch_resolved_markets(days_lookback=days_lookback)
+    markets_data = fetch_resolved_markets(days_lookback_max=days_lookback)
     
     if not markets_data:
         return {
@@ -6,56 +6,43 @@ It identifies various types of market movements and stores them as signals.
 """
 
 import json
-import os
 import time
 import uuid
 from datetime import datetime, timezone, timedelta
 from decimal import Decimal
 import statistics
-
-import boto3
-from boto3.dynamodb.conditions import Key, Attr
+from bisect import bisect_right
 
 from common.config import (
-    MARKETS_TABLE,
     HISTORICAL_TABLE,
     SIGNALS_TABLE,
     THRESHOLDS_TABLE,
-    RESOLUTIONS_TABLE,
-    SIGNAL_TYPES,
     SIGNAL_STRENGTH,
     TIME_WINDOWS,
-    CONFIDENCE_WEIGHTS
+    CONFIDENCE_WEIGHTS,
+    TTL_DAYS
 )
 
 from common.utils import (
-    get_dynamodb_client,
+    get_table,
+    get_dynamodb_low_level_client,
+    deserialize_item,
+    get_active_markets,
+    get_time_bucket,
+    calculate_ttl,
+    calculate_signal_accuracy_metrics,
     calculate_price_change,
     calculate_significant_price_change,
     get_volatility_threshold,
-    get_liquidity_tier
+    get_liquidity_tier,
+    to_decimal
 )
 
-def get_current_markets():
-    """Get all markets from DynamoDB"""
-    try:
-        # Initialize DynamoDB
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(MARKETS_TABLE)
-        
-        # Scan the table to get all markets
-        items = []
-        response = table.scan()
-        items.extend(response.get('Items', []))
-        
-        while 'LastEvaluatedKey' in response:
-            response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            items.extend(response.get('Items', []))
-        
-        return items
-    except Exception as e:
-        print(f"Error getting markets from DynamoDB: {e}")
-        return []
+# Build the DynamoDB clients and table handles during init so warm
+# invocations (and SnapStart restores) reuse them
+get_dynamodb_low_level_client()
+get_table(SIGNALS_TABLE)
+get_table(THRESHOLDS_TABLE)
 
 def get_historical_prices_for_time_windows(market_id, outcome_index, time_windows):
     """
@@ -68,37 +55,36 @@ def get_historical_prices_for_time_windows(market_id, outcome_index, time_window
         time_windows: List of time windows in hours
     """
     try:
-        # Initialize DynamoDB
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(HISTORICAL_TABLE)
+        # Plain client: prices come back as floats rather than Decimals
+        paginator = get_dynamodb_low_level_client().get_paginator('query')
         
         # Get current time
         now = datetime.now(timezone.utc)
         
-        # Initialize results
-        results = {}
+        # One query covers the widest window; the narrower windows are
+        # suffixes of it, since rows come back sorted by timestamp
+        timestamp_oldest = (now - timedelta(hours=max(time_windows))).isoformat()
+        pages = paginator.paginate(
+            TableName=HISTORICAL_TABLE,
+            KeyConditionExpression='market_id = :market_id AND #ts > :since',
+            FilterExpression='outcome_index = :outcome_index',
+            ProjectionExpression='#ts, timestamp_epoch, outcome_index, price',
+            ExpressionAttributeNames={'#ts': 'timestamp'},
+            ExpressionAttributeValues={
+                ':market_id': {'S': market_id},
+                ':since': {'S': timestamp_oldest},
+                ':outcome_index': {'N': str(int(outcome_index))}
+            }
+        )
+        prices = [deserialize_item(item) for page in pages for item in page['Items']]
         
-        # Get historical prices for each time window
+        timestamps = [item.get('timestamp', '') for item in prices]
+        
+        # Slice out each time window
+        results = {}
         for window in time_windows:
-            # Calculate timestamp for window hours ago
             timestamp_window_ago = (now - timedelta(hours=window)).isoformat()
-            
-            # Query historical prices
-            response = table.query(
-                KeyConditionExpression=Key('market_id').eq(market_id) & Key('timestamp').gt(timestamp_window_ago)
-            )
-            
-            # Filter for the specific outcome
-            prices = [
-                item for item in response.get('Items', [])
-                if item.get('outcome_index') == outcome_index
-            ]
-            
-            # Sort by timestamp
-            prices.sort(key=lambda x: x.get('timestamp', ''))
-            
-            # Store in results
-            results[window] = prices
+            results[window] = prices[bisect_right(timestamps, timestamp_window_ago):]
         
         return results
     except Exception as e:
@@ -137,10 +123,12 @@ def calculate_price_momentum(prices, window_size=3):
     if len(prices) < window_size:
         return 0
     
-    # Extract price values and timestamps
+    # Extract price values and timestamps (epoch seconds; rows written before
+    # timestamp_epoch existed fall back to parsing the ISO timestamp)
     price_data = [
         (
-            datetime.fromisoformat(item.get('timestamp')), 
+            float(item['timestamp_epoch']) if 'timestamp_epoch' in item
+            else datetime.fromisoformat(item.get('timestamp')).timestamp(),
             float(item.get('price', 0))
         )
         for item in prices
@@ -153,7 +141,7 @@ def calculate_price_momentum(prices, window_size=3):
         end_time, end_price = price_data[i + window_size]
         
         # Calculate time difference in hours
-        time_diff = (end_time - start_time).total_seconds() / 3600
+        time_diff = (end_time - start_time) / 3600
         
         if time_diff > 0 and start_price > 0:
             # Calculate price change per hour
@@ -167,6 +155,40 @@ def calculate_price_momentum(prices, window_size=3):
     
     return 0
 
+# Per-run caches keyed by (category, liquidity_tier). Every market in a run
+# shares the same few keys, so each is read from DynamoDB at most once per run.
+_threshold_cache = {}
+_accuracy_cache = {}
+
+def clear_run_caches():
+    """Reset the per-run caches so each run sees the latest table state"""
+    _threshold_cache.clear()
+    _accuracy_cache.clear()
+
+def get_threshold_id(category, liquidity_tier):
+    """Get the thresholds table key for a category and liquidity tier"""
+    return f"{category}#{liquidity_tier}"
+
+def get_category_threshold(category, liquidity_tier):
+    """
+    Get the stored base threshold for a category and liquidity tier
+    Returns None if no threshold has been stored yet
+    """
+    key = (category, liquidity_tier)
+    if key not in _threshold_cache:
+        thresholds_table = get_table(THRESHOLDS_TABLE)
+        
+        response = thresholds_table.get_item(
+            Key={'threshold_id': get_threshold_id(category, liquidity_tier)}
+        )
+        
+        if 'Item' in response:
+            _threshold_cache[key] = float(response['Item'].get('base_threshold', 0))
+        else:
+            _threshold_cache[key] = None
+    
+    return _threshold_cache[key]
+
 def get_adaptive_threshold(market):
     """
     Get adaptive threshold for a market based on its characteristics
@@ -180,22 +202,13 @@ def get_adaptive_threshold(market):
         # Get liquidity tier
         tier = get_liquidity_tier(liquidity)
         
-        # Try to get custom threshold from thresholds table
-        dynamodb = get_dynamodb_client()
-        thresholds_table = dynamodb.Table(THRESHOLDS_TABLE)
-        
         # Check for category-specific thresholds
         category_thresholds = []
         for category in categories:
-            response = thresholds_table.get_item(
-                Key={
-                    'category': category,
-                    'liquidity_tier': tier
-                }
-            )
+            threshold = get_category_threshold(category, tier)
             
-            if 'Item' in response:
-                category_thresholds.append(float(response['Item'].get('base_threshold', 0)))
+            if threshold is not None:
+                category_thresholds.append(threshold)
         
         # If we have category-specific thresholds, use the average
         if category_thresholds:
@@ -337,11 +350,11 @@ def save_signal_to_dynamodb(market, signal_data):
         # Add metadata
         signal_data['signal_id'] = signal_id
         signal_data['detection_timestamp'] = datetime.now(timezone.utc).isoformat()
-        signal_data['ttl'] = int((datetime.now(timezone.utc) + timedelta(days=365)).timestamp())
+        signal_data['time_bucket'] = get_time_bucket(signal_data['detection_timestamp'])
+        signal_data['ttl'] = calculate_ttl(TTL_DAYS['signals'])
         
         # Write to DynamoDB
-        dynamodb = get_dynamodb_client()
-        table = dynamodb.Table(SIGNALS_TABLE)
+        table = get_table(SIGNALS_TABLE)
         
         response = table.put_item(Item=signal_data)
         
@@ -354,41 +367,21 @@ def get_historical_signal_accuracy(category=None, liquidity_tier=None):
     """
     Get historical accuracy of signals for a category and liquidity tier
     """
+    key = (category, liquidity_tier)
+    if key in _accuracy_cache:
+        return _accuracy_cache[key]
+    
     try:
-        dynamodb = get_dynamodb_client()
-        signals_table = dynamodb.Table(SIGNALS_TABLE)
-        
-        # Build filter expression
-        filter_expression = Attr('actual_outcome').exists()
-        
-        if category:
-            filter_expression = filter_expression & Attr('category').eq(category)
-        
-        if liquidity_tier:
-            filter_expression = filter_expression & Attr('liquidity_tier').eq(liquidity_tier)
-        
-        # Query signals with resolutions
-        response = signals_table.scan(
-            FilterExpression=filter_expression
-        )
-        
-        signals = response.get('Items', [])
-        
-        # Handle pagination
-        while 'LastEvaluatedKey' in response:
-            response = signals_table.scan(
-                FilterExpression=filter_expression,
-                ExclusiveStartKey=response['LastEvaluatedKey']
-            )
-            signals.extend(response.get('Items', []))
+        metrics = calculate_signal_accuracy_metrics(category, liquidity_tier)
         
         # Calculate accuracy
-        if not signals:
-            return 0.5  # Default to 50% if no data
-        
-        correct_signals = sum(1 for signal in signals if signal.get('was_correct', False))
+        if not metrics['total_signals']:
+            accuracy = 0.5  # Default to 50% if no data
+        else:
+            accuracy = metrics['accuracy']
         
-        return correct_signals / len(signals)
+        _accuracy_cache[key] = accuracy
+        return accuracy
     except Exception as e:
         print(f"Error getting historical signal accuracy: {e}")
         return 0.5  # Default to 50%
@@ -398,15 +391,11 @@ def update_threshold_based_on_performance(category, liquidity_tier, accuracy):
     Update threshold based on historical performance
     """
     try:
-        dynamodb = get_dynamodb_client()
-        thresholds_table = dynamodb.Table(THRESHOLDS_TABLE)
+        thresholds_table = get_table(THRESHOLDS_TABLE)
         
         # Get current threshold
         response = thresholds_table.get_item(
-            Key={
-                'category': category,
-                'liquidity_tier': liquidity_tier
-            }
+            Key={'threshold_id': get_threshold_id(category, liquidity_tier)}
         )
         
         # Initialize with default values if not found
@@ -420,7 +409,7 @@ def update_threshold_based_on_performance(category, liquidity_tier, accuracy):
             current_item = {
                 'category': category,
                 'liquidity_tier': liquidity_tier,
-                'base_threshold': Decimal(str(base_threshold)),
+                'base_threshold': to_decimal(base_threshold),
                 'performance_metrics': {
                     'true_positives': 0,
                     'false_positives': 0,
@@ -449,20 +438,24 @@ def update_threshold_based_on_performance(category, liquidity_tier, accuracy):
         
         # Update performance metrics
         performance_metrics = current_item.get('performance_metrics', {})
-        performance_metrics['accuracy'] = Decimal(str(accuracy))
+        performance_metrics['accuracy'] = to_decimal(accuracy)
         
         # Update threshold in DynamoDB
         thresholds_table.put_item(
             Item={
+                'threshold_id': get_threshold_id(category, liquidity_tier),
                 'category': category,
                 'liquidity_tier': liquidity_tier,
-                'base_threshold': Decimal(str(new_threshold)),
+                'base_threshold': to_decimal(new_threshold),
                 'performance_metrics': performance_metrics,
                 'last_updated': datetime.now(timezone.utc).isoformat(),
-                'ttl': int((datetime.now(timezone.utc) + timedelta(days=365)).timestamp())
+                'ttl': calculate_ttl(TTL_DAYS['thresholds'])
             }
         )
         
+        # Later markets in this run see the updated threshold
+        _threshold_cache[(category, liquidity_tier)] = new_threshold
+        
         return True
     except Exception as e:
         print(f"Error updating threshold: {e}")
@@ -472,6 +465,9 @@ def detect_signals(markets):
     """Detect signals in market data using adaptive thresholds"""
     signals_detected = []
     
+    # Warm containers keep module state between runs
+    clear_run_caches()
+    
     for market in markets:
         try:
             market_id = market.get('id')
@@ -549,14 +545,14 @@ def detect_signals(markets):
                         'signal_type': signal_type,
                         'signal_strength': strength,
                         'time_window': window,
-                        'current_price': Decimal(str(current_price)),
-                        'previous_price': Decimal(str(oldest_price)),
-                        'price_change': Decimal(str(price_change)),
-                        'volatility': Decimal(str(volatility)),
-                        'momentum': Decimal(str(momentum)),
-                        'threshold_used': Decimal(str(threshold)),
-                        'confidence_score': Decimal(str(confidence)),
-                        'liquidity': Decimal(str(liquidity)),
+                        'current_price': to_decimal(current_price),
+                        'previous_price': to_decimal(oldest_price),
+                        'price_change': to_decimal(price_change),
+                        'volatility': to_decimal(volatility),
+                        'momentum': to_decimal(momentum),
+                        'threshold_used': to_decimal(threshold),
+                        'confidence_score': to_decimal(confidence),
+                        'liquidity': to_decimal(liquidity),
                         'liquidity_tier': liquidity_tier,
                         'categories': categories,
                         'tracked_outcome': tracked_outcome,
@@ -583,8 +579,8 @@ def lambda_handler(event, context):
     
     start_time = time.time()
     
-    # Get all markets from DynamoDB
-    markets = get_current_markets()
+    # Get the latest collected markets from DynamoDB
+    markets = get_active_markets()
     print(f"Retrieved {len(markets)} markets from DynamoDB")
     
     # Detect signals
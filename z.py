@@ -8,9 +8,9 @@ It fetches market data, detects significant changes, and simulates posting to X
 
 import os
 import sys
-import json
 import time
 from datetime import datetime, timedelta
+from operator import itemgetter
 import requests
 from decimal import Decimal
 from pprint import pprint
@@ -29,7 +29,8 @@ from common.utils import (
     should_track_market,
     calculate_price_change,
     get_volatility_threshold,
-    generate_post_text
+    generate_post_text,
+    parse_outcomes_and_prices
 )
 
 # Create a cache to store previous market prices
@@ -55,32 +56,6 @@ def fetch_markets(limit=100, offset=0, active=True):
         print(f"Error fetching markets: {e}")
         return None
 
-def parse_outcomes_and_prices(market):
-    """Parse outcomes and prices from market data"""
-    outcomes = []
-    prices = []
-    
-    try:
-        # Parse outcomes
-        if isinstance(market.get('outcomes'), str):
-            outcomes = json.loads(market.get('outcomes', '[]'))
-        elif isinstance(market.get('outcomes'), list):
-            outcomes = market.get('outcomes')
-            
-        # Parse outcome prices
-        if isinstance(market.get('outcomePrices'), str):
-            prices = json.loads(market.get('outcomePrices', '[]'))
-        elif isinstance(market.get('outcomePrices'), list):
-            prices = market.get('outcomePrices')
-            
-        # Convert prices to float
-        prices = [float(price) for price in prices]
-    except (json.JSONDecodeError, ValueError) as e:
-        print(f"Error parsing outcomes/prices for market {market.get('id')}: {e}")
-        return [], []
-        
-    return outcomes, prices
-
 def detect_high_volatility_markets(markets_data):
     """Detect markets with high volatility based on configurable thresholds"""
     high_volatility_markets = []
@@ -117,8 +92,7 @@ def detect_high_volatility_markets(markets_data):
             outcome_index = yes_index
         else:
             # Multi-outcome market - track highest probability outcome
-            outcome_index = prices.index(max(prices))
-            current_price = prices[outcome_index]
+            outcome_index, current_price = max(enumerate(prices), key=itemgetter(1))
         
         if market_id and current_price is not None:
             # Check if we have a previous price for this market